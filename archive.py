@@ -0,0 +1,209 @@
+import gzip
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# Finalized intentions are kept on disk, not in Redis:
+#
+#   <dir>/segment-000001.jsonl.gz   sealed segments, gzip-compressed
+#   <dir>/segment-000002.jsonl      the segment being appended to
+#   <dir>/index.sqlite3             where each record is + FTS5 index
+#
+# Records are JSON lines. The index only stores their position (offsets in the
+# uncompressed segment) and a contentless FTS5 index of their text, so the
+# text itself is stored once, compressed.
+
+
+@dataclass
+class ArchivedIntention:
+    id: int
+    timestamp: float
+    status: str
+    text: str
+    reason: Optional[str]
+    admin_name: Optional[str]
+
+
+class IntentionArchive:
+    SEGMENT_MAX_BYTES = 1024 * 1024
+    DECOMPRESSED_CACHE_SIZE = 4
+
+    STATUS_ACCEPTED = "accepted"
+    STATUS_REJECTED = "rejected"
+    STATUS_BANNED = "banned"
+
+    def __init__(self, directory: str):
+        self._dir = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"))
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                id        INTEGER PRIMARY KEY,
+                timestamp REAL    NOT NULL,
+                status    TEXT    NOT NULL,
+                segment   INTEGER NOT NULL,
+                offset    INTEGER NOT NULL,
+                length    INTEGER NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+                text, reason,
+                content='',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            """)
+
+        row = self._db.execute("SELECT MAX(segment) FROM records").fetchone()
+        self._segment = row[0] or 1
+        if os.path.exists(self._sealed_path(self._segment)):
+            self._segment += 1
+
+        self._decompressed: OrderedDict[int, bytes] = OrderedDict()
+
+    def close(self) -> None:
+        self._db.close()
+
+    # --- Segments ---
+
+    def _active_path(self, segment: int) -> str:
+        return os.path.join(self._dir, f"segment-{segment:06d}.jsonl")
+
+    def _sealed_path(self, segment: int) -> str:
+        return f"{self._active_path(segment)}.gz"
+
+    def _seal(self, segment: int) -> None:
+        active = self._active_path(segment)
+
+        with open(active, "rb") as src:
+            data = src.read()
+        tmp = f"{self._sealed_path(segment)}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=9) as dst:
+            dst.write(data)
+        os.replace(tmp, self._sealed_path(segment))
+        os.remove(active)
+
+    def _read_segment(self, segment: int) -> bytes:
+        if segment in self._decompressed:
+            self._decompressed.move_to_end(segment)
+            return self._decompressed[segment]
+
+        if os.path.exists(self._sealed_path(segment)):
+            with gzip.open(self._sealed_path(segment), "rb") as f:
+                data = f.read()
+            self._decompressed[segment] = data
+            if len(self._decompressed) > self.DECOMPRESSED_CACHE_SIZE:
+                self._decompressed.popitem(last=False)
+            return data
+
+        # The active segment changes on every append, so it's never cached
+        with open(self._active_path(segment), "rb") as f:
+            return f.read()
+
+    # --- Writing ---
+
+    def append(
+        self,
+        status: str,
+        text: str,
+        reason: Optional[str] = None,
+        admin_name: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ) -> int:
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT INTO records (timestamp, status, segment, offset, length) "
+                "VALUES (?, ?, 0, 0, 0)",
+                (timestamp, status),
+            )
+            record_id = cursor.lastrowid
+            assert record_id is not None
+
+            line = (
+                json.dumps(
+                    {
+                        "id": record_id,
+                        "timestamp": timestamp,
+                        "status": status,
+                        "text": text,
+                        "reason": reason,
+                        "admin_name": admin_name,
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            ).encode()
+
+            path = self._active_path(self._segment)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+
+            self._db.execute(
+                "UPDATE records SET segment = ?, offset = ?, length = ? WHERE id = ?",
+                (self._segment, offset, len(line), record_id),
+            )
+            self._db.execute(
+                "INSERT INTO records_fts (rowid, text, reason) VALUES (?, ?, ?)",
+                (record_id, text, reason or ""),
+            )
+
+        if offset + len(line) >= self.SEGMENT_MAX_BYTES:
+            self._seal(self._segment)
+            self._segment += 1
+
+        return record_id
+
+    # --- Reading ---
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def search(self, query: str, limit: int = 10) -> list[ArchivedIntention]:
+        match = build_match_expression(query)
+        if match is None:
+            return []
+
+        rows = self._db.execute(
+            "SELECT r.segment, r.offset, r.length FROM records_fts f "
+            "JOIN records r ON r.id = f.rowid "
+            "WHERE records_fts MATCH ? ORDER BY f.rank LIMIT ?",
+            (match, limit),
+        ).fetchall()
+
+        results = []
+        for segment, offset, length in rows:
+            data = self._read_segment(segment)[offset : offset + length]
+            results.append(ArchivedIntention(**json.loads(data)))
+
+        return results
+
+
+def build_match_expression(query: str) -> Optional[str]:
+    # Every word has to match, as a prefix. Words are quoted so that user
+    # input can't be parsed as FTS5 syntax.
+    terms = [t.replace('"', '""') for t in query.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+_archive: Optional[IntentionArchive] = None
+
+
+def get_archive() -> IntentionArchive:
+    # Opened on first use; most updates never touch the archive
+    global _archive
+
+    if _archive is None:
+        from config import get_config
+
+        _archive = IntentionArchive(get_config().archive_dir)
+
+    return _archive
@@ -0,0 +1,172 @@
+import asyncio
+from datetime import timedelta
+from typing import Optional
+
+from telegram import Bot
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+import metrics
+from i18n import admin_locale
+from ratelimit import TokenBucket, get_rate_limiter
+from render import html, send_html
+from resilience import StateUnavailableError
+from state import get_state
+
+# Chats fetched per SSCAN; progress is saved after each batch, so this is
+# also how many chats may get the message twice after a crash
+BROADCAST_BATCH_SIZE = 50
+BROADCAST_MAX_ATTEMPTS = 3
+# Redis outages are waited out instead of abandoning the broadcast
+BROADCAST_STATE_RETRY_INTERVAL = 30
+
+DELIVERED = "delivered"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+class Broadcaster:
+    # Sends the broadcast stored in Redis, if any, to every known chat.
+    # Progress is checkpointed there too, so start() after a restart picks up
+    # from the last saved batch.
+
+    def __init__(self, bot: Bot):
+        self._bot = bot
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        if self.running:
+            return False
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self) -> None:
+        # The checkpoint stays, the broadcast resumes on the next start()
+        if not self.running:
+            return
+        assert self._task is not None
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._send_all()
+                return
+            except StateUnavailableError as e:
+                print(f"ANONYMOUS INTENTIONS BOT: Broadcast paused: {e}")
+                await asyncio.sleep(BROADCAST_STATE_RETRY_INTERVAL)
+
+    async def _send_all(self) -> None:
+        broadcast = get_state().get_broadcast()
+        if broadcast is None:
+            return
+
+        text = broadcast["text"]
+        cursor = broadcast["cursor"]
+        counts = {
+            DELIVERED: broadcast["delivered"],
+            BLOCKED: broadcast["blocked"],
+            FAILED: broadcast["failed"],
+        }
+        bucket = get_rate_limiter()
+
+        while True:
+            next_cursor, chat_ids = get_state().scan_chats(cursor, BROADCAST_BATCH_SIZE)
+
+            # Tokens are taken in order; the sends themselves overlap, so
+            # the rate isn't capped by Telegram's response time
+            sends: list[asyncio.Task] = []
+            try:
+                for chat_id in chat_ids:
+                    await bucket.acquire()
+                    sends.append(
+                        asyncio.create_task(self._deliver(bucket, chat_id, text))
+                    )
+                outcomes = await asyncio.gather(*sends)
+            except asyncio.CancelledError:
+                for send in sends:
+                    send.cancel()
+                raise
+
+            for outcome in outcomes:
+                counts[outcome] += 1
+                metrics.inc(f"broadcast_{outcome}")
+
+            get_state().save_broadcast_progress(
+                next_cursor,
+                counts[DELIVERED],
+                counts[BLOCKED],
+                counts[FAILED],
+                [
+                    chat_id
+                    for chat_id, outcome in zip(chat_ids, outcomes)
+                    if outcome == BLOCKED
+                ],
+            )
+
+            if next_cursor == 0:
+                break
+            cursor = next_cursor
+
+        get_state().finish_broadcast()
+
+        print(
+            "ANONYMOUS INTENTIONS BOT: Broadcast finished: "
+            f"{counts[DELIVERED]} delivered, {counts[BLOCKED]} blocked, "
+            f"{counts[FAILED]} failed"
+        )
+
+        try:
+            await send_html(
+                self._bot,
+                broadcast["report_chat_id"],
+                html(
+                    admin_locale(),
+                    "broadcast.finished",
+                    delivered=counts[DELIVERED],
+                    blocked=counts[BLOCKED],
+                    failed=counts[FAILED],
+                ),
+            )
+        except TelegramError as e:
+            print(f"ANONYMOUS INTENTIONS BOT: Broadcast report failed: {e}")
+
+    async def _deliver(self, bucket: TokenBucket, chat_id: int, text: str) -> str:
+        for _ in range(BROADCAST_MAX_ATTEMPTS):
+            try:
+                await send_html(self._bot, chat_id, text)
+            except RetryAfter as e:
+                delay = e.retry_after
+                bucket.pause(
+                    delay.total_seconds() if isinstance(delay, timedelta) else delay
+                )
+                await bucket.acquire()
+                continue
+            except Forbidden:
+                # Blocked the bot or deleted their account
+                return BLOCKED
+            except TelegramError as e:
+                print(f"ANONYMOUS INTENTIONS BOT: Broadcast to a chat failed: {e}")
+                return FAILED
+            return DELIVERED
+
+        return FAILED
+
+
+_broadcaster: Optional[Broadcaster] = None
+
+
+def init_broadcaster(bot: Bot) -> Broadcaster:
+    global _broadcaster
+    _broadcaster = Broadcaster(bot)
+    return _broadcaster
+
+
+def get_broadcaster() -> Broadcaster:
+    if _broadcaster is None:
+        raise RuntimeError("Broadcaster was not initialized")
+    return _broadcaster
@@ -0,0 +1,112 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import time
+from typing import Callable, Optional, TypeVar
+from zoneinfo import ZoneInfo
+
+# Kept free of telegram/redis imports: it's loaded by every entry point,
+# including the ones that never start the bot.
+
+T = TypeVar("T")
+
+
+def require_env(name: str, cast: Callable[[str], T] = str) -> T:
+    value = os.getenv(name)
+
+    if value is None:
+        raise RuntimeError(f"Env var {name} is not set")
+
+    try:
+        return cast(value)
+    except Exception as e:
+        raise RuntimeError(
+            f"Env var {name} must be {cast.__name__}, got {value!r}"
+        ) from e
+
+
+def optional_env(name: str, default: T, cast: Callable[[str], T] = str) -> T:
+    if os.getenv(name) is None:
+        return default
+    return require_env(name, cast)
+
+
+def flag(value: str) -> bool:
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(value)
+
+
+def secret_key(value: str) -> bytes:
+    # Any non-empty secret, stretched/truncated to a 32-byte key
+    if not value:
+        raise ValueError("empty secret")
+    return hashlib.sha256(value.encode()).digest()
+
+
+def parse_publish_times(value: str, tz: ZoneInfo) -> list[time]:
+    # "08:00,20:30" -> [time(8, 0), time(20, 30)]
+    times = []
+
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        hour, minute = part.split(":", 1)
+        times.append(time(int(hour), int(minute), tzinfo=tz))
+
+    return times
+
+
+@dataclass(frozen=True)
+class Config:
+    bot_token: str
+    activation_password: str
+    redis_host: str
+    redis_port: int
+    user_hash_key: bytes
+    publish_channel_id: int
+    publish_times: list[time]
+    shutdown_timeout: float
+    archive_dir: str
+    reminder_after_hours: float
+    default_locale: str
+    admin_locale: str
+    allow_media: bool
+    record_updates: Optional[str]
+
+
+_config: Optional[Config] = None
+
+
+def get_config() -> Config:
+    global _config
+
+    if _config is None:
+        publish_timezone = ZoneInfo(optional_env("PUBLISH_TIMEZONE", "UTC"))
+        default_locale = optional_env("DEFAULT_LOCALE", "pt")
+
+        _config = Config(
+            bot_token=require_env("TELEGRAM_BOT_TOKEN"),
+            activation_password=require_env("ACTIVATION_PASSWORD"),
+            redis_host=require_env("REDIS_HOST"),
+            redis_port=require_env("REDIS_PORT", int),
+            user_hash_key=require_env("USER_HASH_KEY", secret_key),
+            publish_channel_id=require_env("PUBLISH_CHANNEL_ID", int),
+            publish_times=parse_publish_times(
+                optional_env("PUBLISH_TIMES", ""), publish_timezone
+            ),
+            shutdown_timeout=optional_env("SHUTDOWN_TIMEOUT", 20.0, float),
+            archive_dir=optional_env("ARCHIVE_DIR", "archive"),
+            reminder_after_hours=optional_env("REMINDER_AFTER_HOURS", 24.0, float),
+            default_locale=default_locale,
+            admin_locale=optional_env("ADMIN_LOCALE", default_locale),
+            allow_media=optional_env("ALLOW_MEDIA", False, flag),
+            record_updates=optional_env("RECORD_UPDATES", "") or None,
+        )
+
+    return _config
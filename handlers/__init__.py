@@ -0,0 +1,21 @@
+import importlib
+from typing import Any, Awaitable, Callable
+
+Callback = Callable[..., Awaitable[Any]]
+
+
+def lazy(path: str) -> Callback:
+    # "handlers.admin:reject" -> a callback that only imports handlers.admin
+    # (and whatever it pulls in) the first time it's actually called
+    module_name, attr = path.split(":", 1)
+    target: Callback | None = None
+
+    async def callback(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), attr)
+        return await target(*args, **kwargs)
+
+    callback.__name__ = attr
+    callback.__qualname__ = attr
+    return callback
@@ -0,0 +1,1114 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Optional
+
+from telegram import Chat, Message, Update
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import ContextTypes
+
+import metrics
+from archive import IntentionArchive, get_archive
+from broadcast import get_broadcaster
+from config import get_config
+from handlers import guards
+from handlers.common import (
+    format_age,
+    format_timestamp,
+    get_message_link,
+    is_inactive_group_and_notify,
+    retrieve_intention_sender,
+)
+from i18n import admin_locale, resolve_locale, t, template, user_locale
+from messages import get_finalized_intention_keyboard, get_new_intention_keyboard
+from publishing import encode_media_publication, publish_queued_intentions
+from render import edit_html, escape, html, send_html
+from sendqueue import get_send_queue
+from state import get_state
+
+
+async def handle_admin_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if (
+        query is None
+        or query.data is None
+        or query.from_user is None
+        or not isinstance(query.message, Message)
+    ):
+        return
+
+    if await is_inactive_group_and_notify(update, context):
+        await query.answer()
+        return
+
+    if not query.data.startswith("admin_"):
+        await query.answer()
+        return
+
+    locale = admin_locale()
+
+    if query.data == "admin_actions":
+        await context.bot.send_message(
+            query.message.chat_id, text=t(locale, "admin.actions"), parse_mode="HTML"
+        )
+        await query.answer()
+        return
+
+    if query.data.startswith("admin_feedback"):
+        await query.answer(text=t(locale, "admin.feedback_usage"), show_alert=False)
+        return
+
+    # Buttons from before locales were added have no third field
+    action, user_id_str, *rest = query.data.split(":", 2)
+    sender_locale = resolve_locale(rest[0] if rest else None)
+    intention = query.message.text
+
+    try:
+        user_id = int(user_id_str)
+    except ValueError:
+        await query.answer()
+        await query.edit_message_text(
+            t(locale, "admin.invalid_id", intention=intention)
+        )
+        return
+
+    handled, details = get_state().get_intention_status(query.message.message_id)
+    if handled:
+        await query.answer(text=t(locale, "admin.already_handled"))
+        await replace_stale_buttons(query.message, user_id, sender_locale)
+        return
+
+    await query.answer()
+
+    if action == "admin_accept":
+        publication = intention
+        if details is not None and details["media"]:
+            publication = encode_media_publication(intention, details["media"])
+
+        get_state().accept_pending(
+            query.message.message_id, publication, query.message.date.timestamp()
+        )
+        archive_decision(
+            IntentionArchive.STATUS_ACCEPTED,
+            intention,
+            admin_name=query.from_user.first_name,
+        )
+
+        await query.edit_message_reply_markup(
+            get_finalized_intention_keyboard(user_id, sender_locale)
+        )
+
+        admin_name = query.from_user.first_name
+
+        if get_config().publish_times:
+            await query.message.reply_text(
+                t(locale, "admin.accepted_scheduled", admin_name=admin_name)
+            )
+        else:
+            try:
+                await publish_queued_intentions(
+                    context.bot, get_state(), get_config().publish_channel_id
+                )
+            except TelegramError as e:
+                await query.message.reply_text(
+                    t(
+                        locale,
+                        "admin.accepted_publish_failed",
+                        admin_name=admin_name,
+                        error=e,
+                        retry_in=schedule_publish_retry(context, e),
+                    )
+                )
+            else:
+                await query.message.reply_text(
+                    t(locale, "admin.accepted_published", admin_name=admin_name)
+                )
+
+        get_send_queue().submit(
+            partial(
+                send_html,
+                context.bot,
+                user_id,
+                html(sender_locale, "outcome.accepted", intention=intention),
+                reply_markup=get_new_intention_keyboard(sender_locale),
+            )
+        )
+
+
+async def replace_stale_buttons(message: Message, user_id: int, sender_locale: str):
+    # Bulk commands decide intentions without touching their messages, so
+    # their buttons are only replaced when someone uses them
+    await message.edit_reply_markup(
+        get_finalized_intention_keyboard(user_id, sender_locale)
+    )
+
+
+REMINDER_MAX_LINKS = 20
+
+
+def archive_decision(
+    status: str,
+    intention: str,
+    reason: Optional[str] = None,
+    admin_name: Optional[str] = None,
+) -> None:
+    # The decision is already final in Redis by now, so a failing archive
+    # must not keep the sender from being told
+    try:
+        get_archive().append(status, intention, reason, admin_name)
+    except (sqlite3.Error, OSError) as e:
+        metrics.inc("archive_errors")
+        print(f"ANONYMOUS INTENTIONS BOT: Archiving an intention failed: {e}")
+
+
+async def send_overdue_reminders(context: ContextTypes.DEFAULT_TYPE):
+    reminder_after = get_config().reminder_after_hours * 60 * 60
+    assert context.job is not None and context.job.data is not None
+    check_interval = context.job.data
+
+    outbox_chat_id = get_state().get_outbox_chat_id()
+    if outbox_chat_id is None:
+        return
+
+    # Held until the next check, so other replicas skip this round
+    if not get_state().acquire_reminders_lock(check_interval * 0.9):
+        return
+
+    now = time.time()
+    overdue = get_state().pop_due_reminders(now - reminder_after)
+    if not overdue:
+        return
+
+    locale = admin_locale()
+    lines = [
+        t(
+            locale,
+            "reminder.header",
+            count=len(overdue),
+            age=format_age(reminder_after),
+        ),
+        "",
+    ]
+
+    # Every field is built by the bot, so nothing needs escaping
+    reminder_item = template(locale, "reminder.item")
+    for message_id, submitted_at in overdue[:REMINDER_MAX_LINKS]:
+        link = get_message_link(outbox_chat_id, message_id)
+        label = f'<a href="{link}">#{message_id}</a>' if link else f"#{message_id}"
+        lines.append(reminder_item(label=label, age=format_age(now - submitted_at)))
+
+    if len(overdue) > REMINDER_MAX_LINKS:
+        lines.append(
+            t(locale, "reminder.more", count=len(overdue) - REMINDER_MAX_LINKS)
+        )
+
+    lines.append("")
+    lines.append(t(locale, "reminder.footer"))
+
+    await send_html(context.bot, outbox_chat_id, "\n".join(lines))
+
+
+# A failed publication is back in the queue. It's retried after this long,
+# doubling up to the maximum while it keeps failing, or after however long
+# Telegram asks to wait if that's longer.
+PUBLISH_RETRY_DELAY = 60
+PUBLISH_RETRY_MAX_DELAY = 60 * 60
+PUBLISH_RETRY_JOB = "publish_retry"
+
+
+def schedule_publish_retry(
+    context: ContextTypes.DEFAULT_TYPE, error: TelegramError
+) -> str:
+    # Returns when the retry will be, for telling the admins
+    assert context.job_queue is not None
+
+    delay = PUBLISH_RETRY_DELAY
+    if context.job is not None and context.job.name == PUBLISH_RETRY_JOB:
+        delay = min(context.job.data * 2, PUBLISH_RETRY_MAX_DELAY)
+    else:
+        # Already scheduled by an earlier failure
+        for job in context.job_queue.get_jobs_by_name(PUBLISH_RETRY_JOB):
+            if job.next_t is not None:
+                return format_age(
+                    (job.next_t - datetime.now(timezone.utc)).total_seconds()
+                )
+
+    wait = delay
+    if isinstance(error, RetryAfter):
+        retry_after = error.retry_after
+        wait = max(
+            wait,
+            (
+                retry_after.total_seconds()
+                if isinstance(retry_after, timedelta)
+                else retry_after
+            ),
+        )
+
+    context.job_queue.run_once(
+        publish_scheduled_intentions, wait, data=delay, name=PUBLISH_RETRY_JOB
+    )
+    return format_age(wait)
+
+
+async def publish_scheduled_intentions(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        published = await publish_queued_intentions(
+            context.bot, get_state(), get_config().publish_channel_id
+        )
+    except TelegramError as e:
+        retry_in = schedule_publish_retry(context, e)
+        outbox_chat_id = get_state().get_outbox_chat_id()
+        if outbox_chat_id is not None:
+            await context.bot.send_message(
+                outbox_chat_id,
+                t(admin_locale(), "admin.publish_failed", error=e, retry_in=retry_in),
+            )
+        return
+
+    if published:
+        print(f"ANONYMOUS INTENTIONS BOT: Published {published} intention(s)")
+
+
+async def reject(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.message is None:
+        return
+
+    if update.message.from_user is None:
+        return
+
+    locale = admin_locale()
+
+    if not context.args:
+        await update.message.reply_text(t(locale, "admin.reason_required"))
+        return
+
+    if update.message.reply_to_message is None:
+        await update.message.reply_text(t(locale, "admin.reply_required"))
+        return
+
+    intention_msg = update.message.reply_to_message
+    sender = retrieve_intention_sender(intention_msg)
+
+    if sender is None or intention_msg.text is None:
+        await update.message.reply_text(t(locale, "admin.bad_reply"))
+        return
+
+    intention_sender_id, sender_locale = sender
+
+    if get_state().is_handled(intention_msg.message_id):
+        await replace_stale_buttons(intention_msg, intention_sender_id, sender_locale)
+        await update.message.reply_text(t(locale, "admin.already_handled"))
+        return
+
+    intention = intention_msg.text
+    reason = " ".join(context.args)
+    admin_name = update.message.from_user.first_name
+
+    get_state().reject_pending(intention_msg.message_id, intention_msg.date.timestamp())
+    archive_decision(IntentionArchive.STATUS_REJECTED, intention, reason, admin_name)
+
+    await edit_html(
+        intention_msg,
+        html(
+            locale,
+            "admin.rejected",
+            intention=intention,
+            admin_name=admin_name,
+            reason=reason,
+        ),
+        reply_markup=get_finalized_intention_keyboard(
+            intention_sender_id, sender_locale
+        ),
+    )
+
+    get_send_queue().submit(
+        partial(
+            send_html,
+            context.bot,
+            intention_sender_id,
+            html(sender_locale, "outcome.rejected", intention=intention, reason=reason),
+        )
+    )
+
+    await update.message.reply_text(t(locale, "admin.rejected_done"))
+
+
+async def ban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.message is None:
+        return
+
+    if update.message.from_user is None:
+        return
+
+    locale = admin_locale()
+
+    if not context.args:
+        await update.message.reply_text(t(locale, "admin.reason_required"))
+        return
+
+    if update.message.reply_to_message is None:
+        await update.message.reply_text(t(locale, "admin.reply_required"))
+        return
+
+    intention_msg = update.message.reply_to_message
+    sender = retrieve_intention_sender(intention_msg)
+
+    if sender is None or intention_msg.text is None:
+        await update.message.reply_text(t(locale, "admin.bad_reply"))
+        return
+
+    intention_sender_id, sender_locale = sender
+
+    if get_state().is_handled(intention_msg.message_id):
+        await replace_stale_buttons(intention_msg, intention_sender_id, sender_locale)
+        await update.message.reply_text(t(locale, "admin.already_handled"))
+        return
+
+    intention = intention_msg.text
+    reason = " ".join(context.args)
+    admin_id = update.message.from_user.id
+    admin_name = update.message.from_user.first_name
+
+    _, ban_token = get_state().ban_user(
+        intention_sender_id,
+        reason,
+        intention,
+        admin_id,
+        message_id=intention_msg.message_id,
+        submitted_at=intention_msg.date.timestamp(),
+    )
+    archive_decision(IntentionArchive.STATUS_BANNED, intention, reason, admin_name)
+
+    await edit_html(
+        intention_msg,
+        html(
+            locale,
+            "admin.banned",
+            intention=intention,
+            admin_name=admin_name,
+            reason=reason,
+            ban_token=ban_token,
+        ),
+        reply_markup=get_finalized_intention_keyboard(
+            intention_sender_id, sender_locale
+        ),
+    )
+
+    ban_message = html(
+        sender_locale,
+        "outcome.banned",
+        intention=intention,
+        reason=reason,
+        ban_token=ban_token,
+    )
+
+    get_send_queue().submit(
+        partial(send_html, context.bot, intention_sender_id, ban_message)
+    )
+
+    await update.message.reply_text(
+        html(locale, "admin.banned_done", ban_token=ban_token), parse_mode="HTML"
+    )
+
+
+async def unban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.effective_chat is None or update.effective_message is None:
+        return
+
+    group_id = update.effective_chat.id
+    message_id = update.effective_message.id
+    locale = admin_locale()
+
+    if not context.args:
+        await context.bot.send_message(
+            chat_id=group_id,
+            text=t(locale, "admin.token_required"),
+            reply_to_message_id=message_id,
+        )
+        return
+
+    ban_token = context.args[0]
+    response = None
+
+    if get_state().unban_user(ban_token):
+        response = t(locale, "admin.unbanned")
+    else:
+        response = t(locale, "admin.unknown_token")
+
+    await context.bot.send_message(
+        chat_id=group_id,
+        text=response,
+        reply_to_message_id=message_id,
+    )
+
+
+async def feedback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.message is None:
+        return
+
+    if update.message.from_user is None:
+        return
+
+    locale = admin_locale()
+
+    if not context.args:
+        await update.message.reply_text(t(locale, "admin.message_required"))
+        return
+
+    if update.message.reply_to_message is None:
+        await update.message.reply_text(t(locale, "admin.reply_required"))
+        return
+
+    intention_msg = update.message.reply_to_message
+    sender = retrieve_intention_sender(intention_msg, allow_finalized=True)
+
+    if sender is None or intention_msg.text is None:
+        await update.message.reply_text(t(locale, "admin.bad_reply"))
+        return
+
+    intention_sender_id, sender_locale = sender
+    intention = intention_msg.text
+    feedback_text = " ".join(context.args)
+
+    ban_message = html(
+        sender_locale, "outcome.feedback", intention=intention, feedback=feedback_text
+    )
+
+    get_send_queue().submit(
+        partial(send_html, context.bot, intention_sender_id, ban_message)
+    )
+
+    await update.message.reply_text(t(locale, "admin.feedback_sent"))
+
+
+async def baninfo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_chat is None or update.effective_message is None:
+        return
+
+    reply_to_id = update.effective_message.id
+
+    if update.effective_chat.type in (Chat.GROUP, Chat.SUPERGROUP):
+        # We're in a group, so it should only be used by admins
+        if await is_inactive_group_and_notify(update, context):
+            return
+
+        group_id = update.effective_chat.id
+        locale = admin_locale()
+
+        if not context.args:
+            await context.bot.send_message(
+                group_id,
+                t(locale, "admin.token_required"),
+                reply_to_message_id=reply_to_id,
+            )
+            return
+
+        ban_token = context.args[0]
+        ban_info = get_state().get_ban_info_by_ban_token(ban_token)
+
+        response = None
+
+        if ban_info is None:
+            response = t(locale, "admin.unknown_token")
+        else:
+            response = html(
+                locale,
+                "admin.ban_details",
+                timestamp=format_timestamp(float(ban_info["timestamp"])),
+                intention=ban_info["intention"],
+                reason=ban_info["reason"],
+                ban_token=ban_token,
+            )
+
+        await send_html(
+            context.bot, group_id, response, reply_to_message_id=reply_to_id
+        )
+    else:
+        # Private messages
+        assert update.effective_user
+
+        user_id = update.effective_user.id
+        locale = user_locale(update.effective_user)
+        ban_token = guards.ban_token(context, user_id)
+
+        if ban_token is None:
+            await context.bot.send_message(
+                user_id,
+                t(locale, "banned.not_banned"),
+                reply_to_message_id=reply_to_id,
+            )
+            return
+
+        ban_info = get_state().get_ban_info_by_ban_token(ban_token)
+        assert ban_info is not None
+
+        description = html(
+            locale,
+            "banned.details",
+            timestamp=format_timestamp(float(ban_info["timestamp"])),
+            intention=ban_info["intention"],
+            reason=ban_info["reason"],
+            ban_token=ban_token,
+        )
+
+        await send_html(
+            context.bot, user_id, description, reply_to_message_id=reply_to_id
+        )
+
+
+QUEUE_PAGE_SIZE = 10
+
+
+async def queue(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.effective_chat is None or update.effective_message is None:
+        return
+
+    group_id = update.effective_chat.id
+    reply_to_id = update.effective_message.id
+    locale = admin_locale()
+
+    page = 1
+    if context.args:
+        try:
+            page = max(1, int(context.args[0]))
+        except ValueError:
+            await context.bot.send_message(
+                group_id,
+                t(locale, "queue.usage"),
+                parse_mode="HTML",
+                reply_to_message_id=reply_to_id,
+            )
+            return
+
+    count, oldest_timestamp, items = get_state().get_pending_page(
+        page - 1, QUEUE_PAGE_SIZE
+    )
+
+    if count == 0 or oldest_timestamp is None:
+        await context.bot.send_message(
+            group_id,
+            t(locale, "queue.empty"),
+            reply_to_message_id=reply_to_id,
+        )
+        return
+
+    now = time.time()
+    page_count = (count + QUEUE_PAGE_SIZE - 1) // QUEUE_PAGE_SIZE
+
+    lines = [
+        t(locale, "queue.header", count=count),
+        t(locale, "queue.oldest", age=format_age(now - oldest_timestamp)),
+        "",
+        t(locale, "queue.page", page=page, page_count=page_count),
+    ]
+
+    # Every field is built by the bot, so nothing needs escaping
+    queue_item = template(locale, "queue.item")
+    for message_id, timestamp in items:
+        link = get_message_link(group_id, message_id)
+        label = f'<a href="{link}">#{message_id}</a>' if link else f"#{message_id}"
+        lines.append(queue_item(label=label, age=format_age(now - timestamp)))
+
+    if not items:
+        lines.append(t(locale, "queue.empty_page"))
+    elif page < page_count:
+        lines.append("")
+        lines.append(t(locale, "queue.next_page", page=page + 1))
+
+    await send_html(
+        context.bot, group_id, "\n".join(lines), reply_to_message_id=reply_to_id
+    )
+
+
+BULK_MAX = 500
+# Outbox message ids are shared with everything else said in the group, so
+# a range can cover many more ids than intentions
+BULK_SELECTION_MAX = 5000
+
+
+def parse_intention_ids(arg: str) -> Optional[list[int]]:
+    # "N", "N-M" or several of them separated by commas, where N is the
+    # number shown as #N in /queue. Numbers don't shift when other
+    # intentions are decided in the meantime, positions would.
+    ids: dict[int, None] = {}
+    for part in arg.split(","):
+        first, _, last = part.partition("-")
+        try:
+            start = int(first.strip().lstrip("#"))
+            stop = int(last.strip().lstrip("#")) if last else start
+        except ValueError:
+            return None
+
+        if start < 1 or stop < start or len(ids) + stop - start >= BULK_SELECTION_MAX:
+            return None
+        ids.update(dict.fromkeys(range(start, stop + 1)))
+
+    return list(ids)
+
+
+def split_decidable(
+    items: list[tuple[int, float, Optional[dict]]],
+) -> tuple[list[tuple[int, float, dict]], int]:
+    # Intentions sent before their details were stored can only be decided
+    # from their own message
+    decidable = [(mid, ts, details) for mid, ts, details in items if details]
+    return decidable, len(items) - len(decidable)
+
+
+async def bulk_accept(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.message is None or update.message.from_user is None:
+        return
+
+    locale = admin_locale()
+
+    if context.args:
+        message_ids = parse_intention_ids(context.args[0])
+        if message_ids is None:
+            await update.message.reply_text(
+                t(locale, "admin.bulk_accept_usage"), parse_mode="HTML"
+            )
+            return
+        pending = get_state().get_pending_by_ids(message_ids, BULK_MAX)
+    else:
+        pending = get_state().get_pending_range(0, BULK_MAX - 1)
+
+    items, skipped = split_decidable(pending)
+    admin_name = update.message.from_user.first_name
+
+    if not items:
+        lines = [t(locale, "admin.bulk_nothing")]
+        if skipped:
+            lines.append(t(locale, "admin.bulk_skipped", count=skipped))
+        await update.message.reply_text("\n\n".join(lines))
+        return
+
+    get_state().accept_pending_many(
+        [
+            (
+                message_id,
+                (
+                    encode_media_publication(details["text"], details["media"])
+                    if details["media"]
+                    else details["text"]
+                ),
+                submitted_at,
+            )
+            for message_id, submitted_at, details in items
+        ]
+    )
+
+    for _, _, details in items:
+        archive_decision(
+            IntentionArchive.STATUS_ACCEPTED, details["text"], admin_name=admin_name
+        )
+        get_send_queue().submit(
+            partial(
+                send_html,
+                context.bot,
+                details["user_id"],
+                html(details["locale"], "outcome.accepted", intention=details["text"]),
+                reply_markup=get_new_intention_keyboard(details["locale"]),
+            )
+        )
+
+    lines = [t(locale, "admin.bulk_accepted", count=len(items), admin_name=admin_name)]
+
+    if get_config().publish_times:
+        lines.append(t(locale, "admin.bulk_publish_scheduled"))
+    else:
+        try:
+            await publish_queued_intentions(
+                context.bot, get_state(), get_config().publish_channel_id
+            )
+        except TelegramError as e:
+            lines.append(
+                t(
+                    locale,
+                    "admin.bulk_publish_failed",
+                    error=e,
+                    retry_in=schedule_publish_retry(context, e),
+                )
+            )
+        else:
+            lines.append(t(locale, "admin.bulk_published"))
+
+    if skipped:
+        lines.append(t(locale, "admin.bulk_skipped", count=skipped))
+
+    await update.message.reply_text("\n\n".join(lines))
+
+
+async def bulk_reject(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.message is None or update.message.from_user is None:
+        return
+
+    locale = admin_locale()
+
+    message_ids = parse_intention_ids(context.args[0]) if context.args else None
+    if message_ids is None or len(context.args or ()) < 2:
+        await update.message.reply_text(
+            t(locale, "admin.bulk_reject_usage"), parse_mode="HTML"
+        )
+        return
+
+    assert context.args
+    reason = " ".join(context.args[1:])
+    items, skipped = split_decidable(
+        get_state().get_pending_by_ids(message_ids, BULK_MAX)
+    )
+    admin_name = update.message.from_user.first_name
+
+    if not items:
+        lines = [t(locale, "admin.bulk_nothing")]
+        if skipped:
+            lines.append(t(locale, "admin.bulk_skipped", count=skipped))
+        await update.message.reply_text("\n\n".join(lines))
+        return
+
+    get_state().reject_pending_many(
+        [(message_id, submitted_at) for message_id, submitted_at, _ in items]
+    )
+
+    for _, _, details in items:
+        archive_decision(
+            IntentionArchive.STATUS_REJECTED, details["text"], reason, admin_name
+        )
+        get_send_queue().submit(
+            partial(
+                send_html,
+                context.bot,
+                details["user_id"],
+                html(
+                    details["locale"],
+                    "outcome.rejected",
+                    intention=details["text"],
+                    reason=reason,
+                ),
+            )
+        )
+
+    lines = [
+        html(
+            locale,
+            "admin.bulk_rejected",
+            count=len(items),
+            admin_name=admin_name,
+            reason=reason,
+        )
+    ]
+    if skipped:
+        lines.append(t(locale, "admin.bulk_skipped", count=skipped))
+
+    await send_html(context.bot, update.message.chat_id, "\n\n".join(lines))
+
+
+STATS_DEFAULT_DAYS = 7
+STATS_MAX_DAYS = 90
+STATS_DAILY_BREAKDOWN_MAX_DAYS = 14
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.effective_chat is None or update.effective_message is None:
+        return
+
+    group_id = update.effective_chat.id
+    reply_to_id = update.effective_message.id
+    locale = admin_locale()
+
+    days = STATS_DEFAULT_DAYS
+    if context.args:
+        try:
+            days = min(STATS_MAX_DAYS, max(1, int(context.args[0])))
+        except ValueError:
+            await context.bot.send_message(
+                group_id,
+                t(locale, "stats.usage"),
+                parse_mode="HTML",
+                reply_to_message_id=reply_to_id,
+            )
+            return
+
+    buckets, unique_submitters = get_state().get_stats(days)
+
+    def total(field: str) -> float:
+        return sum(float(bucket.get(field, 0)) for _, bucket in buckets)
+
+    submitted = int(total("submitted"))
+    accepted = int(total("accepted"))
+    rejected = int(total("rejected"))
+    banned = int(total("banned"))
+    responses = int(total("responses"))
+    response_seconds = total("response_seconds")
+
+    lines = [
+        t(locale, "stats.header", days=days),
+        "",
+        t(locale, "stats.submitted", submitted=submitted, per_day=submitted / days),
+        t(
+            locale,
+            "stats.outcomes",
+            accepted=accepted,
+            rejected=rejected,
+            banned=banned,
+        ),
+    ]
+
+    if responses:
+        lines.append(t(locale, "stats.acceptance_rate", rate=accepted / responses))
+        lines.append(
+            t(
+                locale,
+                "stats.response_time",
+                age=format_age(response_seconds / responses),
+            )
+        )
+
+    lines.append(t(locale, "stats.unique_submitters", count=unique_submitters))
+
+    if days <= STATS_DAILY_BREAKDOWN_MAX_DAYS:
+        lines.append("")
+        for day, bucket in buckets:
+            lines.append(
+                t(
+                    locale,
+                    "stats.day",
+                    day=day,
+                    submitted=bucket.get("submitted", 0),
+                    accepted=bucket.get("accepted", 0),
+                )
+            )
+
+    await context.bot.send_message(
+        group_id,
+        "\n".join(lines),
+        parse_mode="HTML",
+        reply_to_message_id=reply_to_id,
+    )
+
+
+SEARCH_RESULTS = 10
+SEARCH_PREVIEW_LENGTH = 300
+SEARCH_REASON_LENGTH = 100
+
+ARCHIVE_STATUS_LABELS = {
+    IntentionArchive.STATUS_ACCEPTED: "archive.accepted",
+    IntentionArchive.STATUS_REJECTED: "archive.rejected",
+    IntentionArchive.STATUS_BANNED: "archive.banned",
+}
+
+
+def truncate(text: str, length: int) -> str:
+    if len(text) > length:
+        return text[:length] + "…"
+    return text
+
+
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.effective_chat is None or update.effective_message is None:
+        return
+
+    group_id = update.effective_chat.id
+    reply_to_id = update.effective_message.id
+    locale = admin_locale()
+
+    if not context.args:
+        await context.bot.send_message(
+            group_id,
+            t(locale, "search.usage"),
+            reply_to_message_id=reply_to_id,
+        )
+        return
+
+    results = get_archive().search(" ".join(context.args), limit=SEARCH_RESULTS)
+
+    if not results:
+        await context.bot.send_message(
+            group_id,
+            t(locale, "search.no_results"),
+            reply_to_message_id=reply_to_id,
+        )
+        return
+
+    entries = []
+    for result in results:
+        status = result.status
+        if status in ARCHIVE_STATUS_LABELS:
+            status = t(locale, ARCHIVE_STATUS_LABELS[status])
+
+        header = f"{format_timestamp(result.timestamp)} · {escape(status)}"
+        if result.admin_name:
+            header += html(locale, "search.by", admin_name=result.admin_name)
+        if result.reason:
+            header += html(
+                locale,
+                "search.reason",
+                reason=truncate(result.reason, SEARCH_REASON_LENGTH),
+            )
+
+        entries.append(
+            f"{header}\n{escape(truncate(result.text, SEARCH_PREVIEW_LENGTH))}"
+        )
+
+    # Split into several messages if the results don't fit in one
+    await send_html(
+        context.bot,
+        group_id,
+        t(locale, "search.results", count=len(results))
+        + "\n\n"
+        + "\n\n—\n\n".join(entries),
+        reply_to_message_id=reply_to_id,
+    )
+
+
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.message is None or update.message.text is None:
+        return
+
+    locale = admin_locale()
+    broadcaster = get_broadcaster()
+
+    if broadcaster.running:
+        await update.message.reply_text(t(locale, "broadcast.running"))
+        return
+
+    # Keeps the admin's formatting; the command itself is never formatted
+    _, *rest = update.message.text_html.split(None, 1)
+    text = rest[0].strip() if rest else ""
+
+    if not text:
+        if get_state().get_broadcast() is not None:
+            broadcaster.start()
+            await update.message.reply_text(t(locale, "broadcast.resumed"))
+        else:
+            await update.message.reply_text(
+                t(locale, "broadcast.usage"), parse_mode="HTML"
+            )
+        return
+
+    if not get_state().start_broadcast(text, update.message.chat_id):
+        await update.message.reply_text(t(locale, "broadcast.unfinished"))
+        return
+
+    broadcaster.start()
+
+    await update.message.reply_text(
+        t(locale, "broadcast.started", count=get_state().count_chats())
+    )
+
+
+async def show_metrics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_inactive_group_and_notify(update, context):
+        return
+
+    if update.effective_chat is None or update.effective_message is None:
+        return
+
+    lines = [f"{name}: {value}" for name, value in metrics.snapshot().items()]
+    text = "\n".join(lines) or t(admin_locale(), "metrics.empty")
+
+    # Metric names have labels like {closed->open}
+    await send_html(
+        context.bot,
+        update.effective_chat.id,
+        f"<pre>{escape(text)}</pre>",
+        reply_to_message_id=update.effective_message.id,
+    )
+
+
+async def on_added_to_group(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.my_chat_member is None:
+        return
+
+    new_status = update.my_chat_member.new_chat_member.status
+    if (
+        new_status in ("member", "administrator")
+        and update.effective_chat is not None
+        and update.effective_chat.type in (Chat.GROUP, Chat.SUPERGROUP)
+    ):
+        group_id = update.my_chat_member.chat.id
+        if group_id == guards.outbox_chat_id(context):
+            await context.bot.send_message(
+                chat_id=group_id, text=t(admin_locale(), "group.back")
+            )
+        else:
+            await context.bot.send_message(
+                chat_id=group_id, text=t(admin_locale(), "group.password_prompt")
+            )
+
+
+async def handle_group_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    global outbox_chat_id
+
+    message = update.message
+    if (
+        message is None
+        or message.text is None
+        or message.chat.type not in ("group", "supergroup")
+    ):
+        return
+
+    # We only want to deal with replies to the bot
+
+    if message.reply_to_message is None:
+        return
+
+    replied_to = message.reply_to_message
+
+    if (
+        replied_to.from_user is None
+        or not replied_to.from_user.is_bot
+        or replied_to.from_user.id != context.bot.id
+    ):
+        return
+
+    chat_id = message.chat.id
+    outbox_chat_id = guards.outbox_chat_id(context)
+    locale = admin_locale()
+
+    if outbox_chat_id != chat_id:
+        # This comes NOT from the group we're active in, so we only care about
+        # the activation password.
+        if message.text != get_config().activation_password:
+            await message.reply_text(t(locale, "group.wrong_password"))
+            return
+
+        if outbox_chat_id is not None:
+            await context.bot.send_message(
+                chat_id=outbox_chat_id,
+                text=t(locale, "group.unlinked"),
+            )
+
+        get_state().set_outbox_chat_id(chat_id)
+        await message.reply_text(t(locale, "group.activated"))
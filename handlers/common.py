@@ -0,0 +1,135 @@
+import logging
+from datetime import datetime, timezone
+
+from telegram import Chat, Message, Update
+from telegram.ext import ContextTypes
+
+from handlers import guards
+from i18n import admin_locale, resolve_locale, t, user_locale
+from render import html
+from resilience import StateUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+async def is_banned_and_notify(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user is None:
+        # Silent failure; I expect this to never happen
+        return True
+
+    user_id = update.effective_user.id
+    ban_token = guards.ban_token(context, user_id)
+
+    if ban_token is None:
+        return False
+
+    notification = html(
+        user_locale(update.effective_user), "banned.notice", ban_token=ban_token
+    )
+
+    if update.effective_message is None:
+        await context.bot.send_message(
+            chat_id=user_id, text=notification, parse_mode="HTML"
+        )
+    else:
+        await context.bot.send_message(
+            chat_id=user_id,
+            text=notification,
+            parse_mode="HTML",
+            reply_to_message_id=update.effective_message.id,
+        )
+
+    return True
+
+
+async def is_inactive_group_and_notify(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+):
+    if update.effective_chat is None:
+        # Silent failure; I expect this to never happen
+        return True
+
+    if update.effective_chat.type not in (Chat.GROUP, Chat.SUPERGROUP):
+        # Normally should only end up here in case a user is trying to use admin
+        # commands in private messaging; silent failure, don't acknowledge
+        return True
+
+    chat_id = update.effective_chat.id
+    outbox_chat_id = guards.outbox_chat_id(context)
+
+    if outbox_chat_id == chat_id:
+        return False
+
+    text = t(admin_locale(), "group.inactive")
+
+    if update.effective_message is None:
+        await context.bot.send_message(chat_id, text)
+    else:
+        await context.bot.send_message(
+            chat_id, text, reply_to_message_id=update.effective_message.message_id
+        )
+
+    return True
+
+
+def retrieve_intention_sender(
+    intention_msg: Message, allow_finalized=False
+) -> tuple[int, str] | None:
+    # Sender id and locale, from the buttons added by get_admin_keyboard
+    if intention_msg.reply_markup is not None:
+        for row in intention_msg.reply_markup.inline_keyboard:
+            for button in row:
+                if (
+                    isinstance(button.callback_data, str)
+                    and ":" in button.callback_data
+                ):
+                    command, sender = button.callback_data.split(":", 1)
+                    if command != "admin_feedback" or allow_finalized:
+                        sender_id, _, locale = sender.partition(":")
+                        return int(sender_id), resolve_locale(locale or None)
+                break
+            break
+
+    return None
+
+
+def format_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def format_age(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}min"
+    return f"{minutes}min"
+
+
+def get_message_link(chat_id: int, message_id: int) -> str | None:
+    # Only supergroups have linkable messages: -100<internal id>
+    chat_id_str = str(chat_id)
+    if not chat_id_str.startswith("-100"):
+        return None
+    return f"https://t.me/c/{chat_id_str[4:]}/{message_id}"
+
+
+async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE):
+    if not isinstance(context.error, StateUnavailableError):
+        logger.error("Exception while handling an update", exc_info=context.error)
+        return
+
+    if isinstance(update, Update) and update.effective_chat is not None:
+        if update.effective_chat.type == Chat.PRIVATE:
+            locale = user_locale(update.effective_user)
+        else:
+            locale = admin_locale()
+
+        await context.bot.send_message(
+            update.effective_chat.id, t(locale, "unavailable")
+        )
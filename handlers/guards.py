@@ -0,0 +1,74 @@
+from typing import Any, Optional
+
+from telegram import Chat, Update
+from telegram.ext import Application, CallbackContext, ExtBot
+
+from resilience import StateUnavailableError
+from state import get_state
+
+
+class BotContext(CallbackContext[ExtBot, dict, dict, dict]):
+    # One per update, shared by the handlers of every group. The guards look
+    # up what they need the first time one of them asks, see resolve_guards()
+
+    def __init__(
+        self,
+        application: Application,
+        chat_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+    ):
+        super().__init__(application, chat_id, user_id)
+        # Bans only matter in private chats
+        self.guard_user_id: Optional[int] = None
+        self.guards_resolved = False
+        self.outbox_chat_id: Optional[int] = None
+        # Ban token of guard_user_id, if they're banned
+        self.ban_token: Optional[str] = None
+
+    @classmethod
+    def from_update(cls, update: object, application: Application) -> "BotContext":
+        context = super().from_update(update, application)
+        if (
+            isinstance(update, Update)
+            and update.effective_chat is not None
+            and update.effective_chat.type == Chat.PRIVATE
+            and update.effective_user is not None
+        ):
+            context.guard_user_id = update.effective_user.id
+        return context
+
+
+def resolve_guards(context: Any) -> bool:
+    # Everything the guards need, looked up in a single round-trip the first
+    # time a guard runs for the update. Updates no guard looks at cost none.
+    if not isinstance(context, BotContext):
+        return False
+    if context.guards_resolved:
+        return True
+
+    try:
+        context.outbox_chat_id, context.ban_token = get_state().get_guard_info(
+            context.guard_user_id
+        )
+    except StateUnavailableError:
+        # Left unresolved: the guards fall back to the cached reads
+        return False
+
+    context.guards_resolved = True
+    return True
+
+
+def outbox_chat_id(context: CallbackContext) -> Optional[int]:
+    if resolve_guards(context):
+        return context.outbox_chat_id
+    return get_state().get_outbox_chat_id()
+
+
+def ban_token(context: CallbackContext, user_id: int) -> Optional[str]:
+    if (
+        isinstance(context, BotContext)
+        and context.guard_user_id == user_id
+        and resolve_guards(context)
+    ):
+        return context.ban_token
+    return get_state().get_ban_token_by_user(user_id)
@@ -0,0 +1,398 @@
+import time
+from typing import Optional
+
+from telegram import Message, Update
+from telegram.ext import ContextTypes
+
+from config import get_config
+from handlers import guards
+from handlers.common import is_banned_and_notify
+from i18n import admin_locale, t, user_locale
+from media import Media, extract_media, send_media
+from messages import (
+    get_admin_keyboard,
+    get_confirmation_keyboard,
+    get_instructions_keyboard,
+    get_new_intention_keyboard,
+    get_rules_and_instructions,
+)
+from regexes import parse_anon_intention, parse_named_intention
+from render import edit_html, html, send_html
+from state import get_state
+
+# Albums arrive as one message per item; items are collected for this long
+# after the first one and then handled as a single intention
+ALBUM_WINDOW = 1.5
+# Items arriving later still join the album's intention while it waits for
+# confirmation; albums are forgotten this long after their first item
+ALBUM_MEMORY = 60
+
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat = update.effective_chat
+
+    if chat is None or chat.type != "private":
+        return
+
+    locale = user_locale(update.effective_user)
+
+    await context.bot.send_message(
+        chat_id=chat.id,
+        text=t(locale, "intro"),
+        parse_mode="HTML",
+        reply_markup=get_instructions_keyboard(locale, newbie=True),
+    )
+
+
+async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    assert update.effective_chat is not None
+    await context.bot.send_message(
+        update.effective_chat.id, t(user_locale(update.effective_user), "pong")
+    )
+
+
+async def show_instructions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if query is None:
+        return
+
+    await query.answer()
+
+    chat = query.message.chat if query.message else None
+    if chat is None or chat.type != "private":
+        return
+
+    locale = user_locale(query.from_user)
+    first_message_id = None
+
+    for text in get_rules_and_instructions(locale, get_config().allow_media):
+        m = await context.bot.send_message(
+            chat_id=chat.id, text=text, parse_mode="HTML"
+        )
+        if first_message_id is None:
+            first_message_id = m.id
+
+    data = query.data
+    assert data is not None
+    is_newbie = ":newbie" in data
+
+    text = None
+
+    if is_newbie:
+        text = t(locale, "instructions.read_all")
+    else:
+        text = t(locale, "instructions.read_from_here")
+
+    await context.bot.send_message(
+        chat_id=chat.id,
+        text=text,
+        reply_markup=get_new_intention_keyboard(locale),
+        reply_to_message_id=first_message_id,
+    )
+
+
+async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await is_banned_and_notify(update, context):
+        return
+
+    if context.user_data is None:
+        return
+
+    message = update.message
+    if message is None or message.text is None:
+        return
+
+    chat = message.chat
+    if chat.type != "private":
+        return
+
+    if message.text.startswith("/"):
+        return
+
+    await ask_confirmation(
+        context, chat.id, user_locale(message.from_user), message.text, None, message.id
+    )
+
+
+def process_intention(text: Optional[str]) -> str:
+    # Labeled in the admins' language, it's what gets published
+    if not text:
+        return t(admin_locale(), "intention.media_only")
+
+    parsed = parse_named_intention(text)
+    if parsed is not None:
+        return t(
+            admin_locale(),
+            "intention.named",
+            name=parsed["name"],
+            intention=parsed["intention"],
+        )
+
+    return t(
+        admin_locale(), "intention.anonymous", intention=parse_anon_intention(text)
+    )
+
+
+async def ask_confirmation(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    locale: str,
+    text: Optional[str],
+    media: Optional[Media],
+    reply_to_message_id: int,
+) -> bool:
+    # Returns whether the intention is now the one waiting for confirmation
+    assert context.user_data is not None
+
+    if context.user_data.get("pending_intention") is not None:
+        await context.bot.send_message(
+            chat_id,
+            t(locale, "intention.already_pending"),
+            reply_markup=get_new_intention_keyboard(locale),
+            reply_to_message_id=reply_to_message_id,
+        )
+        return False
+
+    processed_intention = process_intention(text)
+
+    context.user_data["pending_intention"] = processed_intention
+    if media:
+        context.user_data["pending_media"] = media
+        confirmation = html(
+            locale,
+            "intention.confirm_media",
+            count=len(media),
+            intention=processed_intention,
+        )
+    else:
+        confirmation = html(locale, "intention.confirm", intention=processed_intention)
+
+    await send_html(
+        context.bot,
+        chat_id,
+        confirmation,
+        reply_markup=get_confirmation_keyboard(locale),
+        reply_to_message_id=reply_to_message_id,
+    )
+    return True
+
+
+def clear_pending(user_data: dict) -> None:
+    user_data.pop("pending_intention", None)
+    user_data.pop("pending_media", None)
+    user_data.pop("pending_album", None)
+
+
+async def handle_private_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if context.user_data is None or context.chat_data is None:
+        return
+
+    message = update.message
+    if message is None or message.chat.type != "private":
+        return
+
+    group_id = message.media_group_id
+    albums = context.chat_data.setdefault("albums", {})
+    album = albums.get(group_id) if group_id is not None else None
+
+    if album is not None:
+        await add_to_album(context, message, album)
+        return
+
+    # Only the first item of an album is checked and answered; the rest
+    # follow whatever was decided for it
+    refused = await is_banned_and_notify(update, context)
+    locale = user_locale(message.from_user)
+
+    if not refused and not get_config().allow_media:
+        await message.reply_text(t(locale, "media.not_allowed"))
+        refused = True
+
+    if group_id is None:
+        attachment = extract_media(message)
+        if not refused and attachment is not None:
+            await ask_confirmation(
+                context,
+                message.chat.id,
+                locale,
+                message.caption,
+                [attachment],
+                message.id,
+            )
+        return
+
+    now = time.time()
+    for old_id in [g for g, a in albums.items() if a["started"] < now - ALBUM_MEMORY]:
+        del albums[old_id]
+
+    albums[group_id] = album = {
+        "started": now,
+        "refused": refused,
+        "flushed": False,
+        "media": [],
+        "caption": None,
+        "reply_to": message.id,
+        "locale": locale,
+    }
+    if refused:
+        return
+
+    await add_to_album(context, message, album)
+
+    assert context.job_queue is not None
+    context.job_queue.run_once(
+        flush_album,
+        ALBUM_WINDOW,
+        data=group_id,
+        chat_id=message.chat.id,
+        user_id=message.from_user.id if message.from_user else None,
+    )
+
+
+async def add_to_album(
+    context: ContextTypes.DEFAULT_TYPE, message: Message, album: dict
+) -> None:
+    assert context.user_data is not None
+
+    attachment = extract_media(message)
+    if album["refused"] or attachment is None:
+        return
+
+    if not album["flushed"]:
+        album["media"].append(attachment)
+        # The caption usually comes with the first item, but not always
+        album["caption"] = album["caption"] or message.caption
+        return
+
+    # Arrived after the album was handled: it joins the intention if that's
+    # still waiting for confirmation
+    locale = album["locale"]
+    if context.user_data.get("pending_album") == message.media_group_id:
+        context.user_data["pending_media"].append(attachment)
+        await message.reply_text(
+            t(
+                locale,
+                "media.album_item_added",
+                count=len(context.user_data["pending_media"]),
+            )
+        )
+    else:
+        await message.reply_text(t(locale, "media.album_item_late"))
+
+
+async def flush_album(context: ContextTypes.DEFAULT_TYPE):
+    assert context.job is not None and context.job.chat_id is not None
+    if context.chat_data is None or context.user_data is None:
+        return
+
+    album = context.chat_data.get("albums", {}).get(context.job.data)
+    if album is None or album["flushed"]:
+        return
+
+    # Kept, without its items, so late ones are recognized
+    album["flushed"] = True
+    media, album["media"] = album["media"], []
+
+    if await ask_confirmation(
+        context,
+        context.job.chat_id,
+        album["locale"],
+        album["caption"],
+        media,
+        album["reply_to"],
+    ):
+        context.user_data["pending_album"] = context.job.data
+
+
+async def handle_confirmation_buttons(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+):
+    if context.user_data is None:
+        return
+
+    query = update.callback_query
+    if query is None or not isinstance(query.message, Message):
+        return
+
+    await query.answer()
+
+    if await is_banned_and_notify(update, context):
+        return
+
+    data = query.data
+    intention = context.user_data.get("pending_intention")
+    locale = user_locale(query.from_user)
+
+    if intention is None:
+        await query.edit_message_text(t(locale, "intention.nothing_pending"))
+        return
+
+    if data == "confirm_send":
+        outbox_chat_id = guards.outbox_chat_id(context)
+        if outbox_chat_id is None:
+            await context.bot.send_message(
+                query.message.chat.id, t(locale, "intention.not_activated")
+            )
+            return
+
+        # Attachments go first, and the admins act on the text message
+        # with the buttons, which replies to them
+        media = context.user_data.get("pending_media")
+        reply_to_message_id = None
+        if media:
+            attachments = await send_media(context.bot, outbox_chat_id, media)
+            reply_to_message_id = attachments[0].message_id
+
+        sent = await context.bot.send_message(
+            chat_id=outbox_chat_id,
+            text=intention,
+            reply_markup=get_admin_keyboard(query.message.chat.id, locale),
+            reply_to_message_id=reply_to_message_id,
+        )
+        get_state().add_pending(
+            sent.message_id, query.from_user.id, intention, locale, media=media
+        )
+        clear_pending(context.user_data)
+
+        await edit_html(
+            query.message,
+            html(locale, "intention.sent", intention=intention),
+            reply_markup=get_new_intention_keyboard(locale),
+        )
+
+        return
+
+    if data == "cancel_send":
+        await query.edit_message_text(
+            t(locale, "intention.cancelled"),
+            reply_markup=get_new_intention_keyboard(locale),
+            parse_mode="HTML",
+        )
+        clear_pending(context.user_data)
+        return
+
+
+async def handle_new_intention_button(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+):
+    if context.user_data is None:
+        return
+
+    query = update.callback_query
+    if query is None or query.message is None:
+        return
+
+    await query.answer()
+
+    if await is_banned_and_notify(update, context):
+        return
+
+    locale = user_locale(query.from_user)
+
+    clear_pending(context.user_data)
+    await context.bot.send_message(
+        chat_id=query.message.chat.id,
+        text=t(locale, "ready"),
+        parse_mode="HTML",
+        reply_markup=get_instructions_keyboard(locale),
+    )
@@ -0,0 +1,38 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from handlers import Callback, lazy
+
+PRIVATE = "handlers.private"
+ADMIN = "handlers.admin"
+
+# Callback data is "<route>" or "<route>:<arguments>". The route picks the
+# handler with a single lookup, instead of every CallbackQueryHandler trying
+# its pattern in turn.
+
+CALLBACK_ROUTES: dict[str, Callback] = {
+    # No guards
+    "instructions": lazy(f"{PRIVATE}:show_instructions"),
+    # Guard against: banned users
+    "confirm_send": lazy(f"{PRIVATE}:handle_confirmation_buttons"),
+    "cancel_send": lazy(f"{PRIVATE}:handle_confirmation_buttons"),
+    "new_intention": lazy(f"{PRIVATE}:handle_new_intention_button"),
+    # Guard against: inactive group
+    "admin_accept": lazy(f"{ADMIN}:handle_admin_buttons"),
+    "admin_feedback": lazy(f"{ADMIN}:handle_admin_buttons"),
+    "admin_actions": lazy(f"{ADMIN}:handle_admin_buttons"),
+}
+
+
+async def route_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if query is None or query.data is None:
+        return
+
+    callback = CALLBACK_ROUTES.get(query.data.partition(":")[0])
+    if callback is None:
+        # A button nothing handles anymore; stops the client's spinner
+        await query.answer()
+        return
+
+    await callback(update, context)
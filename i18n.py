@@ -0,0 +1,181 @@
+import importlib
+import string
+from functools import lru_cache
+from typing import Callable, Optional
+
+from telegram import User
+
+# Every locale is a module in locales/ with a MESSAGES dict of str.format-style
+# templates. On startup each template is checked against the default locale
+# (same keys, same placeholders) and compiled into a function that evaluates
+# it as an f-string, so rendering never parses a template again.
+# scripts/bench_i18n.py compares it with the inline f-strings it replaced.
+
+AVAILABLE_LOCALES = ("pt", "en")
+
+Template = Callable[..., str]
+# The same template taking its fields as a dict, which is what t() has
+# already collected them into, so they aren't unpacked into arguments again
+Renderer = Callable[[dict], str]
+
+_catalogs: dict[str, dict[str, Template]] = {}
+_renderers: dict[str, dict[str, Renderer]] = {}
+_default_locale: Optional[str] = None
+_admin_locale: Optional[str] = None
+
+
+def _placeholders(template: str) -> frozenset[str]:
+    names = set()
+
+    for _, name, spec, _ in string.Formatter().parse(template):
+        if name is None:
+            continue
+        if not name.isidentifier():
+            # Positional, attribute or index fields would mean something else
+            # once evaluated as an f-string
+            raise ValueError(f"unsupported placeholder {{{name}}}")
+        if spec and "{" in spec:
+            raise ValueError(f"nested placeholder in {{{name}:{spec}}}")
+        names.add(name)
+
+    return frozenset(names)
+
+
+def compile_template(template: str) -> Template:
+    names = _placeholders(template)
+
+    if not names:
+        # Also unescapes "{{" and "}}" once instead of on every call
+        constant = template.format()
+        return lambda: constant
+
+    source = f"lambda *, {', '.join(sorted(names))}: f{template!r}"
+    return eval(source, {"__builtins__": {}})
+
+
+def compile_renderer(template: str) -> Renderer:
+    names = _placeholders(template)
+
+    if not names:
+        constant = template.format()
+        return lambda fields: constant
+
+    # Field names are passed in as globals (_0, _1...) instead of quoted in
+    # the source, where they could clash with the template's own quotes
+    refs: dict[str, str] = {}
+    parts = []
+    for literal, name, spec, conversion in string.Formatter().parse(template):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if name is None:
+            continue
+        ref = refs.setdefault(name, f"_{len(refs)}")
+        conversion = f"!{conversion}" if conversion else ""
+        spec = f":{spec}" if spec else ""
+        parts.append(f"{{fields[{ref}]{conversion}{spec}}}")
+
+    source = f"lambda fields: f{''.join(parts)!r}"
+    return eval(
+        source, {"__builtins__": {}, **{ref: name for name, ref in refs.items()}}
+    )
+
+
+def load_catalog(locale: str) -> dict[str, str]:
+    return importlib.import_module(f"locales.{locale}").MESSAGES
+
+
+def compile_catalogs(
+    default_locale: str,
+) -> tuple[dict[str, dict[str, Template]], dict[str, dict[str, Renderer]]]:
+    reference = load_catalog(default_locale)
+    expected = {key: _placeholders(text) for key, text in reference.items()}
+
+    catalogs = {}
+    renderers = {}
+    problems = []
+
+    for locale in AVAILABLE_LOCALES:
+        messages = load_catalog(locale)
+
+        for key in expected.keys() - messages.keys():
+            problems.append(f"{locale}: missing {key}")
+        for key in messages.keys() - expected.keys():
+            problems.append(f"{locale}: unknown {key}")
+
+        for key in expected.keys() & messages.keys():
+            try:
+                found = _placeholders(messages[key])
+            except ValueError as e:
+                problems.append(f"{locale}: {key}: {e}")
+                continue
+            if found != expected[key]:
+                problems.append(
+                    f"{locale}: {key} has placeholders {sorted(found)}, "
+                    f"expected {sorted(expected[key])}"
+                )
+
+        catalogs[locale] = {
+            key: compile_template(text) for key, text in messages.items()
+        }
+        renderers[locale] = {
+            key: compile_renderer(text) for key, text in messages.items()
+        }
+
+    if problems:
+        raise ValueError("Invalid locale catalogs:\n  " + "\n  ".join(problems))
+
+    return catalogs, renderers
+
+
+def init_i18n(default_locale: str, admin_locale: str) -> None:
+    global _catalogs, _renderers, _default_locale, _admin_locale
+
+    for locale in (default_locale, admin_locale):
+        if locale not in AVAILABLE_LOCALES:
+            raise ValueError(
+                f"Unknown locale {locale!r}, available: {', '.join(AVAILABLE_LOCALES)}"
+            )
+
+    _catalogs, _renderers = compile_catalogs(default_locale)
+    _default_locale = default_locale
+    _admin_locale = admin_locale
+    resolve_locale.cache_clear()
+
+
+def t(locale: str, key: str, /, **fields) -> str:
+    return _renderers[locale][key](fields)
+
+
+def renderer(locale: str, key: str, /) -> Renderer:
+    # For callers that build the fields dict themselves, e.g. render.html()
+    return _renderers[locale][key]
+
+
+def template(locale: str, key: str, /) -> Template:
+    # For messages rendered many times in a row, e.g. one line per item of a
+    # list: calling the compiled template directly costs what the f-string
+    # did, without t()'s lookups and keyword packing
+    return _catalogs[locale][key]
+
+
+@lru_cache(maxsize=256)
+def resolve_locale(language_code: Optional[str]) -> str:
+    # Telegram sends IETF tags like "pt-br" or "en"; the first one we have
+    # wins, falling back to the default locale
+    assert _default_locale is not None, "i18n not initialized"
+
+    if language_code:
+        tag = language_code.lower().replace("_", "-")
+        for candidate in (tag, tag.split("-", 1)[0]):
+            if candidate in _catalogs:
+                return candidate
+
+    return _default_locale
+
+
+def user_locale(user: Optional[User]) -> str:
+    return resolve_locale(user.language_code if user is not None else None)
+
+
+def admin_locale() -> str:
+    assert _admin_locale is not None, "i18n not initialized"
+    return _admin_locale
@@ -0,0 +1,231 @@
+MESSAGES = {
+    # --- Private chat ---
+    "intro": (
+        "Peace of Christ! I'm the channel's anonymous intentions bot. "
+        "My job is to forward your intentions anonymously to the admins, "
+        "so they can review them and post them to the channel.\n\n"
+        "<b>⚠️ Before using me, press the button below and read the instructions carefully.</b>"
+    ),
+    "instructions.usage": (
+        "<b>HOW TO USE THE BOT</b>\n\n"
+        "1. Just send any message here in your private chat "
+        "with the bot, and it will be forwarded anonymously to the admins after you confirm it.\n\n"
+        "2. Note: if you cancel an intention because you want to change it, "
+        "don't edit the message you had sent. Send a new message with the corrections.\n\n"
+        "3. Use one of the following formats:\n\n"
+        "• For anonymous intentions, just write your intention. "
+        'If you want, you can start your message with "Anonymous intention:", '
+        "but that's entirely optional. Examples:\n\n"
+        "<pre>For my father's health.</pre>\n"
+        "<pre>Anonymous intention: for my father's health.</pre>\n\n"
+        "• If you want to identify yourself, use one of the following formats:\n\n"
+        "<pre>John - For Mary's health.</pre>\n"
+        "<pre>Name: John\n\nIntention: For Mary's health.</pre>"
+    ),
+    "instructions.rules": (
+        "<b>RULES</b>\n\n"
+        "1. {media_rule}\n\n"
+        "2. <b>Never write full names</b>, unless it's a public figure "
+        "(in that case, say who the person is).\n\n"
+        '❌: "For the soul of John Smith"\n'
+        '✔️: "For the soul of the voice actor John Smith"\n\n'
+        "3. Admins are free to leave details out of your intention if that's needed "
+        "to protect people's identities.\n\n"
+        "4. Admins are free to reject intentions at their discretion, and may tell you "
+        "through the bot why an intention was rejected.\n\n"
+        "5. Admins can <b>ban</b> you, blocking your access to the bot, if they consider "
+        "you're misusing it.\n\n"
+        "6. Intentions containing the following are <b>strictly forbidden</b> and will result in an <b>immediate ban</b>:\n"
+        "   • Indecency.\n"
+        "   • Advertising.\n"
+        "   • Requests for money.\n"
+        "   • Harassment of the admins.\n\n"
+        "7. If you're banned, the admins won't know who you were. "
+        "If you want to appeal the ban, the bot will give you a code."
+    ),
+    "rules.text_only": "Send <b>text only</b>. The bot doesn't accept images, audio or any other kind of media.",
+    "rules.media_allowed": (
+        "You can attach photos, videos, audio or files to your intention, with the text as the caption. "
+        "If the intention is posted, the attachments will be too."
+    ),
+    "instructions.read_all": "☝️ Read everything from here. When you're done, just press the button below.",
+    "instructions.read_from_here": "☝️ Read from here.",
+    "ready": (
+        "🫡 I'm ready to receive intentions, send them whenever you want. "
+        "Here are formats ready to copy and paste:\n\n"
+        "<pre>Anonymous intention: </pre>\n\n"
+        "<pre>Name: \n\nIntention: </pre>"
+    ),
+    "pong": "Pong.",
+    "button.instructions": "📖 Instructions & Rules",
+    "button.new_intention": "✍️ New intention",
+    "button.confirm": "✅ Confirm",
+    "button.cancel": "❌ Cancel",
+    "intention.named": "Name: {name}\n\nIntention: {intention}",
+    "intention.anonymous": "Anonymous intention: {intention}",
+    "intention.media_only": "Anonymous intention (attachments only)",
+    "intention.confirm_media": "I'll send your intention with {count} attachment(s) like this. Confirm?\n\n<pre>{intention}</pre>",
+    "media.not_allowed": "I don't accept images, audio or other media, only text. Read the rules.",
+    "media.album_item_added": "One more item of the album arrived and was added to the intention, which now has {count} attachment(s).",
+    "media.album_item_late": "This attachment arrived too late to be part of your album's intention and was ignored.",
+    "intention.already_pending": "Confirm or cancel your last intention before writing a new one. Or select the button below.",
+    "intention.confirm": "I'll send your intention like this. Confirm?\n\n<pre>{intention}</pre>",
+    "intention.nothing_pending": "⚠️ There's no pending intention to send.",
+    "intention.not_activated": "💀 Sorry, I'm not activated right now. Complain to the admins!",
+    "intention.sent": "<pre>{intention}</pre>\n\n—\n\n📨 This intention was sent, now just wait.",
+    "intention.cancelled": "❌ This intention was cancelled.",
+    "banned.notice": (
+        "You are banned and can't use the bot. Talk to an admin and show them the code below.\n\n"
+        "<code>{ban_token}</code>\n\n"
+        "For more information use the command: /baninfo"
+    ),
+    "banned.not_banned": "You are not banned. :)",
+    "banned.details": (
+        "When: <code>{timestamp}</code>\n\n"
+        "Intention:\n\n"
+        "<pre>{intention}</pre>\n\n"
+        "Reason:\n\n"
+        "<pre>{reason}</pre>\n\n"
+        "Show the code below to an admin to appeal your ban. "
+        "Preferably, forward this message.\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "unavailable": "⚠️ I'm having technical problems right now. Try again in a few minutes.",
+    # --- Sent to the submitter by admin actions ---
+    "outcome.accepted": "<pre>{intention}</pre>\n\n✅ The intention above was accepted and will be posted to the channel.",
+    "outcome.rejected": "<pre>{intention}</pre>\n\n❌ The intention above was rejected.\n\nReason: <i>{reason}</i>",
+    "outcome.banned": (
+        "<pre>{intention}</pre>\n\n"
+        "🔨 You were banned because of the intention above.\n\n"
+        "Reason: <i>{reason}</i>\n\n"
+        "If you want to appeal this ban, talk to an admin in person. "
+        "Forward this message to the admin, they'll need the code below to unban you.\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "outcome.feedback": (
+        "<pre>{intention}</pre>\n\n"
+        "📢 An admin sent you a message about the intention above. Read it:\n\n"
+        "<i>{feedback}</i>"
+    ),
+    # --- Admin group ---
+    "admin.actions": (
+        "For actions other than accepting, reply to the intention's message with one of the following commands:\n\n"
+        "/feedback <code>message</code>: sends a message to the intention's sender.\n\n"
+        "/reject <code>reason</code>: rejects the intention.\n\n"
+        "/ban <code>reason</code>: bans the intention's sender.\n\n"
+        "To see the intentions still waiting for review, use /queue. "
+        "To look up intentions already reviewed, use /search <code>words</code>. "
+        "To see statistics, use /stats.\n\n"
+        "To decide on several intentions at once, use the numbers (#) shown by /queue, separated by commas or as ranges:\n\n"
+        "/bulkaccept <code>[101-140,152]</code>: accepts the pending intentions with those numbers (all of them if none are given).\n\n"
+        "/bulkreject <code>101-140,152 reason</code>: rejects the pending intentions with those numbers.\n\n"
+        "To send an announcement to everyone who has sent an intention, use /broadcast <code>message</code>."
+    ),
+    "button.accept": "✅ Accept",
+    "button.feedback": "📢 Feedback",
+    "button.more_options": "ℹ️ More options",
+    "admin.feedback_usage": "Usage: /feedback message",
+    "admin.invalid_id": "{intention}\n\n—\n\n⚠️ Internal error (invalid ID).",
+    "admin.accepted_scheduled": (
+        "✅ Intention accepted by {admin_name}. "
+        "It will be posted to the channel along with the next ones."
+    ),
+    "admin.accepted_publish_failed": (
+        "✅ Intention accepted by {admin_name}, but I couldn't post it to the channel ({error}). "
+        "I'll try again in {retry_in}."
+    ),
+    "admin.accepted_published": "✅ Intention accepted by {admin_name} and posted to the channel.",
+    "admin.publish_failed": (
+        "⚠️ I couldn't post the accepted intentions to the channel ({error}). "
+        "I'll try again in {retry_in}."
+    ),
+    "admin.reason_required": "You need to give a reason.",
+    "admin.message_required": "You need to write a message for the user.",
+    "admin.reply_required": "You must reply to the intention's message.",
+    "admin.bad_reply": "I can't do that with the message you replied to.",
+    "admin.rejected": "{intention}\n\n—\n\n❌ Intention rejected by {admin_name}. Reason: <i>{reason}</i>",
+    "admin.rejected_done": "The intention was ❌rejected and its sender was notified with the given reason.",
+    "admin.banned": (
+        "{intention}\n\n—\n\n🔨 The sender of this intention was banned by {admin_name}. "
+        "Reason: <i>{reason}</i>\n\n<code>{ban_token}</code>\n\n"
+    ),
+    "admin.banned_done": (
+        "The intention's sender was 🔨banned and notified with the given reason. "
+        "To unban them, use the token below with the /unban command.\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "admin.token_required": "Provide the code.",
+    "admin.unbanned": "The user was unbanned. Let them know if you can, since I don't keep the IDs of banned users and have no way to notify them.",
+    "admin.unknown_token": "This code doesn't match any banned user.",
+    "admin.feedback_sent": "📨 Message sent!",
+    "admin.already_handled": "This intention was already reviewed.",
+    "admin.bulk_accept_usage": "Usage: /bulkaccept <code>[numbers or ranges, like 101-140,152]</code>",
+    "admin.bulk_reject_usage": "Usage: /bulkreject <code>numbers or ranges, like 101-140,152</code> <code>reason</code>",
+    "admin.bulk_nothing": "📭 None of the intentions with those numbers is pending.",
+    "admin.bulk_accepted": "✅ {count} intention(s) accepted by {admin_name}.",
+    "admin.bulk_rejected": "❌ {count} intention(s) rejected by {admin_name}. Reason: <i>{reason}</i>",
+    "admin.bulk_skipped": (
+        "⚠️ {count} intention(s) were sent before this version of the bot "
+        "and must be reviewed from their own message."
+    ),
+    "admin.bulk_publish_scheduled": "They will be posted to the channel along with the next ones.",
+    "admin.bulk_published": "They were posted to the channel.",
+    "admin.bulk_publish_failed": (
+        "I couldn't post them to the channel ({error}). "
+        "I'll try again in {retry_in}."
+    ),
+    "admin.ban_details": (
+        "When: <code>{timestamp}</code>\n\n"
+        "Intention:\n\n"
+        "<pre>{intention}</pre>\n\n"
+        "Reason:\n\n"
+        "<pre>{reason}</pre>\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "reminder.header": "⏰ <b>{count}</b> intention(s) waiting for review for more than {age}:",
+    "reminder.item": "• {label} — {age} ago",
+    "reminder.more": "• … and {count} more",
+    "reminder.footer": "Use /queue to see all pending ones.",
+    "queue.usage": "Usage: /queue <code>page</code>",
+    "queue.empty": "📭 There are no pending intentions.",
+    "queue.header": "📥 Pending intentions: <b>{count}</b>",
+    "queue.oldest": "Oldest: {age} ago",
+    "queue.page": "Page {page}/{page_count}:",
+    "queue.item": "• {label} — {age} ago",
+    "queue.empty_page": "(empty page)",
+    "queue.next_page": "Next page: /queue {page}",
+    "stats.usage": "Usage: /stats <code>days</code>",
+    "stats.header": "📊 <b>Last {days} day(s)</b> (UTC)",
+    "stats.submitted": "Received: {submitted} (average of {per_day:.1f}/day)",
+    "stats.outcomes": "Accepted: {accepted} · Rejected: {rejected} · Banned: {banned}",
+    "stats.acceptance_rate": "Acceptance rate: {rate:.0%}",
+    "stats.response_time": "Average response time: {age}",
+    "stats.unique_submitters": "Distinct senders: ~{count}",
+    "stats.day": "<code>{day}</code>: {submitted} received, {accepted} accepted",
+    "search.usage": "Usage: /search words",
+    "search.no_results": "🔎 No intentions found.",
+    "search.results": "🔎 {count} most relevant result(s):",
+    "search.by": " by {admin_name}",
+    "search.reason": " (reason: {reason})",
+    "archive.accepted": "✅ accepted",
+    "archive.rejected": "❌ rejected",
+    "archive.banned": "🔨 sender banned",
+    "broadcast.usage": "Usage: /broadcast <code>message</code>",
+    "broadcast.started": "📣 Sending the message to {count} chat(s). I'll let you know here when it's done.",
+    "broadcast.running": "📣 I'm already sending an announcement. Wait for it to finish.",
+    "broadcast.unfinished": "📣 An announcement wasn't fully sent. Use /broadcast with no message to continue it.",
+    "broadcast.resumed": "📣 Continuing to send the last announcement.",
+    "broadcast.finished": (
+        "📣 Announcement sent.\n\n"
+        "Delivered: {delivered}\n"
+        "Blocked the bot: {blocked}\n"
+        "Failed: {failed}"
+    ),
+    "metrics.empty": "Nothing to show.",
+    "group.inactive": "I'm not active in this group. Where's the password?",
+    "group.back": "Hey, I'm back.",
+    "group.password_prompt": "What's the password?",
+    "group.wrong_password": "Wrong password.",
+    "group.unlinked": "I was unlinked from this group. Send the password again to activate me here.",
+    "group.activated": "Activated. I'll forward the intentions here.",
+}
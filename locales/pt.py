@@ -0,0 +1,231 @@
+MESSAGES = {
+    # --- Private chat ---
+    "intro": (
+        "A paz de Cristo! Sou o bot de intenções anônimas do canal. "
+        "Meu trabalho é encaminhar suas intenções anonimamente aos admins, "
+        "para que eles as avaliem e as postem no canal.\n\n"
+        "<b>⚠️ Antes de usar, clique no botão abaixo e leia atentamente as instruções.</b>"
+    ),
+    "instructions.usage": (
+        "<b>INSTRUÇÕES DE USO DO BOT</b>\n\n"
+        "1. Apenas envie uma mensagem qualquer aqui na sua conversa privada "
+        "com o bot, e ela será repassada anonimamente para os admins depois da sua confirmação.\n\n"
+        "2. Obs.: caso você cancele o envio de uma intenção porque quer alterar sua intenção, "
+        "não edite a mensagem que você tinha enviado. Envie uma nova mensagem com as correções.\n\n"
+        "3. Use um dos seguintes formatos:\n\n"
+        "• Para intenções anônimas, apenas escreva o conteúdo da sua intenção. "
+        'Se quiser, você pode prefixar sua mensagem com "Intenção anônima:", '
+        "mas isso é inteiramente opcional. Exemplos:\n\n"
+        "<pre>Pela saúde do meu pai.</pre>\n"
+        "<pre>Intenção anônima: pela saúde do meu pai.</pre>\n\n"
+        "• Caso você queira se identificar, use um dos seguintes formatos:\n\n"
+        "<pre>Fulano - Pela saúde de Sicrano.</pre>\n"
+        "<pre>Nome: Fulano\n\nIntenção: Pela saúde de Sicrano.</pre>"
+    ),
+    "instructions.rules": (
+        "<b>REGRAS DE USO</b>\n\n"
+        "1. {media_rule}\n\n"
+        "2. <b>Nunca coloque nomes completos</b>, a não ser que se trate de um famoso "
+        "(nesse caso, especifique quem é a pessoa).\n\n"
+        '❌: "Pela alma de Fulano da Silva"\n'
+        '✔️: "Pela alma do dublador Fulano da Silva"\n\n'
+        "3. Admins têm liberdade total de omitir detalhes da sua intenção se isso for necessário "
+        "para resguardar a identidade das pessoas.\n\n"
+        "4. Admins são livres para arbitrariamente rejeitar intenções, e poderão te avisar "
+        "através do bot por que uma intenção foi rejeitada.\n\n"
+        "5. Admins podem <b>banir</b> você, bloqueando seu acesso ao bot, caso considerem que "
+        "você está fazendo mau uso dele.\n\n"
+        "6. Resultarão em <b>banimento imediato</b> e estão <b>expressamente proibidas</b> intenções que contenham:\n"
+        "   • Indecências.\n"
+        "   • Divulgações.\n"
+        "   • Pedidos de dinheiro.\n"
+        "   • Importunação para com os admins.\n\n"
+        "7. Caso você seja banido, os admins não saberão quem era você. "
+        "Se quiser contestar o banimento, você receberá um código fornecido pelo bot."
+    ),
+    "rules.text_only": "Envie <b>apenas texto</b>. O bot não aceita imagens, áudios ou qualquer outro tipo de mídia.",
+    "rules.media_allowed": (
+        "Você pode anexar fotos, vídeos, áudios ou arquivos à sua intenção, com o texto na legenda. "
+        "Se a intenção for publicada, os anexos também serão."
+    ),
+    "instructions.read_all": "☝️ Leia tudo a partir daqui. Quando terminar, é só apertar no botão abaixo.",
+    "instructions.read_from_here": "☝️ Leia a partir daqui.",
+    "ready": (
+        "🫡 Estou pronto para receber intenções, envie quando quiser. "
+        "Eis aqui formatos prontos para copiar e colar:\n\n"
+        "<pre>Intenção anônima: </pre>\n\n"
+        "<pre>Nome: \n\nIntenção: </pre>"
+    ),
+    "pong": "Pong.",
+    "button.instructions": "📖 Instruções & Regras",
+    "button.new_intention": "✍️ Nova intenção",
+    "button.confirm": "✅ Confirmar",
+    "button.cancel": "❌ Cancelar",
+    "intention.named": "Nome: {name}\n\nIntenção: {intention}",
+    "intention.anonymous": "Intenção anônima: {intention}",
+    "intention.media_only": "Intenção anônima (só anexos)",
+    "intention.confirm_media": "Vou enviar sua intenção com {count} anexo(s) da seguinte forma. Confirma?\n\n<pre>{intention}</pre>",
+    "media.not_allowed": "Não aceito imagens, áudios ou outras mídias, apenas texto. Leia as regras.",
+    "media.album_item_added": "Mais um anexo do álbum chegou e foi incluído na intenção, que agora tem {count} anexo(s).",
+    "media.album_item_late": "Este anexo chegou tarde demais para entrar na intenção do seu álbum e foi ignorado.",
+    "intention.already_pending": "Confirme ou cancele sua última intenção antes de escrever uma nova. Ou então, selecione o botão abaixo.",
+    "intention.confirm": "Vou enviar sua intenção da seguinte forma. Confirma?\n\n<pre>{intention}</pre>",
+    "intention.nothing_pending": "⚠️ Não há intenção pendente para enviar.",
+    "intention.not_activated": "💀 Desculpe, no momento não estou ativado. Reclame com os admins!",
+    "intention.sent": "<pre>{intention}</pre>\n\n—\n\n📨 Essa intenção foi enviada, agora é só aguardar.",
+    "intention.cancelled": "❌ Essa intenção foi cancelada.",
+    "banned.notice": (
+        "Você está banido e não pode usar o bot. Fale com um admin e mostre o código abaixo.\n\n"
+        "<code>{ban_token}</code>\n\n"
+        "Para mais informações use o comando: /baninfo"
+    ),
+    "banned.not_banned": "Você não está banido. :)",
+    "banned.details": (
+        "Quando: <code>{timestamp}</code>\n\n"
+        "Intenção:\n\n"
+        "<pre>{intention}</pre>\n\n"
+        "Motivo:\n\n"
+        "<pre>{reason}</pre>\n\n"
+        "Apresente o código abaixo a um admin para contestar seu banimento. "
+        "De preferência, encaminhe essa mensagem.\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "unavailable": "⚠️ Estou com problemas técnicos no momento. Tente de novo em alguns minutos.",
+    # --- Sent to the submitter by admin actions ---
+    "outcome.accepted": "<pre>{intention}</pre>\n\n✅ A intenção acima foi aceita e será publicada no canal.",
+    "outcome.rejected": "<pre>{intention}</pre>\n\n❌ A intenção acima foi rejeitada.\n\nMotivo: <i>{reason}</i>",
+    "outcome.banned": (
+        "<pre>{intention}</pre>\n\n"
+        "🔨 Você foi banido por causa da intenção acima.\n\n"
+        "Motivo: <i>{reason}</i>\n\n"
+        "Se quiser contestar esse banimento, fale com algum admin pessoalmente. "
+        "Encaminhe para o admin esta mensagem, ele precisará do código abaixo para te desbanir.\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "outcome.feedback": (
+        "<pre>{intention}</pre>\n\n"
+        "📢 Um admin te enviou uma mensagem referente à intenção acima. Leia:\n\n"
+        "<i>{feedback}</i>"
+    ),
+    # --- Admin group ---
+    "admin.actions": (
+        "Para outras ações além de aprovar, responda à mensagem da intenção com um dos seguintes comandos:\n\n"
+        "/feedback <code>mensagem</code>: envia uma mensagem para o remetente da intenção.\n\n"
+        "/reject <code>motivo</code>: rejeita a intenção.\n\n"
+        "/ban <code>motivo</code>: bane o remetente da intenção.\n\n"
+        "Para ver as intenções que ainda aguardam avaliação, use /queue. "
+        "Para procurar intenções já avaliadas, use /search <code>palavras</code>. "
+        "Para ver estatísticas, use /stats.\n\n"
+        "Para decidir várias intenções de uma vez, use os números (#) mostrados em /queue, separados por vírgula ou em intervalos:\n\n"
+        "/bulkaccept <code>[101-140,152]</code>: aceita as intenções pendentes com esses números (sem números, todas).\n\n"
+        "/bulkreject <code>101-140,152 motivo</code>: rejeita as intenções pendentes com esses números.\n\n"
+        "Para enviar um aviso a todos que já mandaram intenções, use /broadcast <code>mensagem</code>."
+    ),
+    "button.accept": "✅ Aceitar",
+    "button.feedback": "📢 Feedback",
+    "button.more_options": "ℹ️ Mais opções",
+    "admin.feedback_usage": "Use: /feedback mensagem",
+    "admin.invalid_id": "{intention}\n\n—\n\n⚠️ Erro interno (ID inválido).",
+    "admin.accepted_scheduled": (
+        "✅ Intenção aceita por {admin_name}. "
+        "Ela será publicada no canal junto com as próximas."
+    ),
+    "admin.accepted_publish_failed": (
+        "✅ Intenção aceita por {admin_name}, mas não consegui publicá-la no canal ({error}). "
+        "Vou tentar de novo em {retry_in}."
+    ),
+    "admin.accepted_published": "✅ Intenção aceita por {admin_name} e publicada no canal.",
+    "admin.publish_failed": (
+        "⚠️ Não consegui publicar as intenções aceitas no canal ({error}). "
+        "Vou tentar de novo em {retry_in}."
+    ),
+    "admin.reason_required": "Você precisa fornecer um motivo.",
+    "admin.message_required": "Você precisa escrever uma mensagem pro usuário.",
+    "admin.reply_required": "Você deve responder à mensagem com a intenção.",
+    "admin.bad_reply": "Não posso fazer isso com a mensagem que você respondeu.",
+    "admin.rejected": "{intention}\n\n—\n\n❌ Intenção rejeitada por {admin_name}. Motivo: <i>{reason}</i>",
+    "admin.rejected_done": "A intenção foi ❌rejeitada e o remetente dela foi notificado com o motivo fornecido.",
+    "admin.banned": (
+        "{intention}\n\n—\n\n🔨 O remetente desta intenção foi banido por {admin_name}. "
+        "Motivo: <i>{reason}</i>\n\n<code>{ban_token}</code>\n\n"
+    ),
+    "admin.banned_done": (
+        "O remetente da intenção foi 🔨banido e ele foi notificado com o motivo fornecido. "
+        "Para desbani-lo, use o token abaixo e o comando /unban.\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "admin.token_required": "Forneça o código.",
+    "admin.unbanned": "O usuário foi desbanido. Se possível, o avise, pois não guardo os ID's de usuários banidos e não tenho como notificá-lo.",
+    "admin.unknown_token": "Esse código não corresponde a nenhum usuário banido.",
+    "admin.feedback_sent": "📨 Mensagem enviada!",
+    "admin.already_handled": "Essa intenção já foi avaliada.",
+    "admin.bulk_accept_usage": "Use: /bulkaccept <code>[números ou intervalos, como 101-140,152]</code>",
+    "admin.bulk_reject_usage": "Use: /bulkreject <code>números ou intervalos, como 101-140,152</code> <code>motivo</code>",
+    "admin.bulk_nothing": "📭 Nenhuma intenção com esses números está pendente.",
+    "admin.bulk_accepted": "✅ {count} intenção(ões) aceita(s) por {admin_name}.",
+    "admin.bulk_rejected": "❌ {count} intenção(ões) rejeitada(s) por {admin_name}. Motivo: <i>{reason}</i>",
+    "admin.bulk_skipped": (
+        "⚠️ {count} intenção(ões) foram enviadas antes desta versão do bot e "
+        "precisam ser avaliadas pela própria mensagem."
+    ),
+    "admin.bulk_publish_scheduled": "Elas serão publicadas no canal junto com as próximas.",
+    "admin.bulk_published": "Elas foram publicadas no canal.",
+    "admin.bulk_publish_failed": (
+        "Não consegui publicá-las no canal ({error}). "
+        "Vou tentar novamente em {retry_in}."
+    ),
+    "admin.ban_details": (
+        "Quando: <code>{timestamp}</code>\n\n"
+        "Intenção:\n\n"
+        "<pre>{intention}</pre>\n\n"
+        "Motivo:\n\n"
+        "<pre>{reason}</pre>\n\n"
+        "<code>{ban_token}</code>"
+    ),
+    "reminder.header": "⏰ <b>{count}</b> intenção(ões) aguardando avaliação há mais de {age}:",
+    "reminder.item": "• {label} — há {age}",
+    "reminder.more": "• … e mais {count}",
+    "reminder.footer": "Use /queue para ver todas as pendentes.",
+    "queue.usage": "Use: /queue <code>página</code>",
+    "queue.empty": "📭 Não há intenções pendentes.",
+    "queue.header": "📥 Intenções pendentes: <b>{count}</b>",
+    "queue.oldest": "Mais antiga: há {age}",
+    "queue.page": "Página {page}/{page_count}:",
+    "queue.item": "• {label} — há {age}",
+    "queue.empty_page": "(página vazia)",
+    "queue.next_page": "Próxima página: /queue {page}",
+    "stats.usage": "Use: /stats <code>dias</code>",
+    "stats.header": "📊 <b>Últimos {days} dia(s)</b> (UTC)",
+    "stats.submitted": "Recebidas: {submitted} (média de {per_day:.1f}/dia)",
+    "stats.outcomes": "Aceitas: {accepted} · Rejeitadas: {rejected} · Banidas: {banned}",
+    "stats.acceptance_rate": "Taxa de aceitação: {rate:.0%}",
+    "stats.response_time": "Tempo médio de resposta: {age}",
+    "stats.unique_submitters": "Remetentes diferentes: ~{count}",
+    "stats.day": "<code>{day}</code>: {submitted} recebidas, {accepted} aceitas",
+    "search.usage": "Use: /search palavras",
+    "search.no_results": "🔎 Nenhuma intenção encontrada.",
+    "search.results": "🔎 {count} resultado(s) mais relevantes:",
+    "search.by": " por {admin_name}",
+    "search.reason": " (motivo: {reason})",
+    "archive.accepted": "✅ aceita",
+    "archive.rejected": "❌ rejeitada",
+    "archive.banned": "🔨 remetente banido",
+    "broadcast.usage": "Use: /broadcast <code>mensagem</code>",
+    "broadcast.started": "📣 Enviando a mensagem para {count} conversa(s). Aviso aqui quando terminar.",
+    "broadcast.running": "📣 Já estou enviando um aviso. Espere ele terminar.",
+    "broadcast.unfinished": "📣 Há um aviso que não terminou de ser enviado. Use /broadcast sem mensagem para continuá-lo.",
+    "broadcast.resumed": "📣 Continuando o envio do último aviso.",
+    "broadcast.finished": (
+        "📣 Aviso enviado.\n\n"
+        "Entregues: {delivered}\n"
+        "Bloquearam o bot: {blocked}\n"
+        "Falharam: {failed}"
+    ),
+    "metrics.empty": "Nada a mostrar.",
+    "group.inactive": "Não estou ativo nesse grupo. Cadê a senha?",
+    "group.back": "Opa, estou de volta.",
+    "group.password_prompt": "Qual é a senha?",
+    "group.wrong_password": "Senha incorreta.",
+    "group.unlinked": "Fui desvinculado deste grupo. Envie a senha novamente para me ativar aqui.",
+    "group.activated": "Ativado. Vou encaminhar as intenções pra cá.",
+}
@@ -0,0 +1,49 @@
+import time
+
+from config import Config
+from resilience import create_redis_client
+from snapshot import export_state, import_state
+from state import BotState
+
+# Commands run from the command line (python main.py <command>) against the
+# bot's Redis, without starting the bot itself.
+
+
+def open_state(config: Config) -> BotState:
+    return BotState(
+        create_redis_client(config.redis_host, config.redis_port),
+        config.user_hash_key,
+    )
+
+
+def migrate_user_tokens(config: Config, batch_size: int) -> None:
+    state = open_state(config)
+    start = time.perf_counter()
+
+    migrated = state.migrate_legacy_user_tokens(batch_size)
+
+    elapsed = time.perf_counter() - start
+    print(f"Migrated {migrated} ban(s) to keyed user tokens in {elapsed:.2f}s")
+    state.close()
+
+
+def export_snapshot(config: Config, path: str, batch_size: int, resume: bool) -> None:
+    r = create_redis_client(config.redis_host, config.redis_port)
+    start = time.perf_counter()
+
+    records = export_state(r, path, batch_size, resume)
+
+    elapsed = time.perf_counter() - start
+    print(f"Exported {records} key(s) to {path} in {elapsed:.2f}s")
+    r.close()
+
+
+def import_snapshot(config: Config, path: str, batch_size: int, resume: bool) -> None:
+    r = create_redis_client(config.redis_host, config.redis_port)
+    start = time.perf_counter()
+
+    records = import_state(r, path, batch_size, resume)
+
+    elapsed = time.perf_counter() - start
+    print(f"Imported {records} key(s) from {path} in {elapsed:.2f}s")
+    r.close()
@@ -0,0 +1,58 @@
+from typing import Any, Optional
+
+from telegram import (
+    Bot,
+    InputMediaAnimation,
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+)
+
+# Media is always sent by file_id: Telegram reuses the file it already has,
+# nothing is downloaded or uploaded again. Attachments are kept as
+# [kind, file_id] pairs, which is also how they're stored in Redis.
+
+Media = list[list[str]]
+
+INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "animation": InputMediaAnimation,
+    "audio": InputMediaAudio,
+    "document": InputMediaDocument,
+}
+
+MEDIA_KINDS = (*INPUT_MEDIA, "voice")
+
+
+def extract_media(message: Message) -> Optional[list[str]]:
+    if message.photo:
+        # Several sizes of the same photo, largest last
+        return ["photo", message.photo[-1].file_id]
+
+    # Animations also come with a document, so they go first
+    for kind in ("animation", "video", "audio", "voice", "document"):
+        attachment = getattr(message, kind)
+        if attachment is not None:
+            return [kind, attachment.file_id]
+
+    return None
+
+
+async def send_media(
+    bot: Bot, chat_id: int, media: Media, caption: Optional[str] = None, **kwargs: Any
+) -> list[Message]:
+    # The caption goes on the first item, which is where Telegram shows an
+    # album's caption
+    if len(media) == 1:
+        kind, file_id = media[0]
+        send = getattr(bot, f"send_{kind}")
+        return [await send(chat_id, file_id, caption=caption, **kwargs)]
+
+    items = [
+        INPUT_MEDIA[kind](file_id, caption=caption if i == 0 else None)
+        for i, (kind, file_id) in enumerate(media)
+    ]
+    return list(await bot.send_media_group(chat_id, items, **kwargs))
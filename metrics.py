@@ -0,0 +1,19 @@
+from collections import Counter
+
+# In-process counters and gauges, reset on restart. They're meant for quick
+# inspection through /metrics, not for long-term statistics.
+
+_counters: Counter[str] = Counter()
+_gauges: dict[str, str] = {}
+
+
+def inc(name: str, value: int = 1) -> None:
+    _counters[name] += value
+
+
+def set_gauge(name: str, value: str) -> None:
+    _gauges[name] = value
+
+
+def snapshot() -> dict[str, int | str]:
+    return {**dict(sorted(_counters.items())), **dict(sorted(_gauges.items()))}
@@ -0,0 +1,89 @@
+from typing import Any, Optional
+
+from telegram.ext import Application, BasePersistence, PersistenceInput
+
+from resilience import StateUnavailableError
+from state import BotState
+
+
+class RedisPersistence(BasePersistence[dict, dict, dict]):
+    # Only user_data is persisted, which is where the pending intention
+    # waiting for confirmation lives. Users with nothing pending have no
+    # entry at all, so this never becomes a list of everyone who used the bot.
+    #
+    # Writes go through the state, so they fail fast while its breaker is
+    # open. PTB forgets which users changed before writing them, so the ones
+    # that failed are marked again for the next run.
+
+    def __init__(self, state: BotState, update_interval: float = 5):
+        super().__init__(
+            store_data=PersistenceInput(
+                bot_data=False, chat_data=False, user_data=True, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self._state = state
+        # Set once the application is built, see main.build_application()
+        self.application: Optional[Application] = None
+
+    async def get_user_data(self) -> dict[int, dict]:
+        return self._state.get_all_user_data()
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        try:
+            self._state.save_user_data(user_id, data)
+        except StateUnavailableError:
+            self._retry_later(user_id)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        try:
+            self._state.drop_user_data(user_id)
+        except StateUnavailableError:
+            # Saving the (now empty) user_data deletes it as well
+            self._retry_later(user_id)
+
+    def _retry_later(self, user_id: int) -> None:
+        if self.application is not None:
+            self.application.mark_data_for_update_persistence(user_ids=user_id)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        # Every update is written straight to Redis, nothing is buffered here
+        pass
+
+    # --- Not persisted ---
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> Any:
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        return {}
+
+    async def update_conversation(self, name: str, key: Any, new_state: Any) -> None:
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
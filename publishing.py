@@ -0,0 +1,166 @@
+import json
+from functools import partial
+from itertools import groupby
+from typing import Any, Awaitable, Callable, Optional
+
+from telegram import Bot
+from telegram.constants import MessageLimit
+from telegram.error import TelegramError
+
+from media import Media, send_media
+from state import BotState
+
+INTENTION_SEPARATOR = "\n\n—\n\n"
+
+# Intentions with attachments are queued as this prefix followed by
+# {"text": ..., "media": [[kind, file_id], ...]}. Plain intentions always
+# start with their label, so they can't be mistaken for one.
+MEDIA_PUBLICATION_PREFIX = "media:"
+
+
+def encode_media_publication(text: str, media: Media) -> str:
+    return MEDIA_PUBLICATION_PREFIX + json.dumps(
+        {"text": text, "media": media}, ensure_ascii=False
+    )
+
+
+def decode_media_publication(entry: str) -> Optional[tuple[str, Media]]:
+    if not entry.startswith(MEDIA_PUBLICATION_PREFIX):
+        return None
+    data = json.loads(entry[len(MEDIA_PUBLICATION_PREFIX) :])
+    return data["text"], data["media"]
+
+
+def split_long_text(text: str, limit: int) -> list[str]:
+    chunks = []
+
+    while len(text) > limit:
+        # Prefer breaking at a line break, then at a space
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+
+    if text:
+        chunks.append(text)
+
+    return chunks
+
+
+def group_into_messages(
+    intentions: list[str], limit: int = MessageLimit.MAX_TEXT_LENGTH
+) -> list[tuple[str, list[str]]]:
+    # Returns (message text, intentions contained in it) pairs, so that
+    # whatever wasn't sent can be put back in the queue. An intention longer
+    # than the limit gets a message of its own, split when it's sent.
+    messages: list[tuple[str, list[str]]] = []
+    current: list[str] = []
+    current_len = 0
+
+    def close_current():
+        nonlocal current, current_len
+        if current:
+            messages.append((INTENTION_SEPARATOR.join(current), current))
+        current = []
+        current_len = 0
+
+    for intention in intentions:
+        if len(intention) > limit:
+            close_current()
+            messages.append((intention, [intention]))
+            continue
+
+        extra = len(intention) + (len(INTENTION_SEPARATOR) if current else 0)
+        if current_len + extra > limit:
+            close_current()
+            extra = len(intention)
+
+        current.append(intention)
+        current_len += extra
+
+    close_current()
+
+    return messages
+
+
+# A publication goes out in one or more steps, each with what has to be put
+# back in the queue if it fails. Once part of a publication is out, that's
+# only the part that isn't, so nothing is posted twice.
+Step = tuple[Callable[[], Awaitable[Any]], list[str]]
+
+
+def text_steps(bot: Bot, chat_id: int, text: str, entries: list[str]) -> list[Step]:
+    chunks = split_long_text(text, MessageLimit.MAX_TEXT_LENGTH)
+    return [
+        (
+            partial(bot.send_message, chat_id=chat_id, text=chunk),
+            # The rest is queued as a publication without attachments, so
+            # it goes out on its own and can't be taken for one
+            (
+                entries
+                if i == 0
+                else [encode_media_publication("\n".join(chunks[i:]), [])]
+            ),
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def media_publication_steps(bot: Bot, chat_id: int, entry: str) -> list[Step]:
+    decoded = decode_media_publication(entry)
+    assert decoded is not None
+    text, media = decoded
+
+    if not media:
+        return text_steps(bot, chat_id, text, [entry])
+
+    if len(text) <= MessageLimit.CAPTION_LENGTH:
+        return [(partial(send_media, bot, chat_id, media, caption=text), [entry])]
+
+    # Too long for a caption, the text follows the attachments instead
+    return [
+        (partial(send_media, bot, chat_id, media), [entry]),
+        *text_steps(bot, chat_id, text, [encode_media_publication(text, [])]),
+    ]
+
+
+async def publish_queued_intentions(bot: Bot, state: BotState, channel_id: int) -> int:
+    intentions = state.pop_publications()
+    published = 0
+
+    # Consecutive text intentions are grouped into as few messages as
+    # possible; intentions with attachments go out on their own, in order
+    publications: list[tuple[list[str], list[Step]]] = []
+
+    for has_media, run in groupby(
+        intentions, key=lambda it: it.startswith(MEDIA_PUBLICATION_PREFIX)
+    ):
+        if has_media:
+            for entry in run:
+                publications.append(
+                    ([entry], media_publication_steps(bot, channel_id, entry))
+                )
+        else:
+            for text, contained in group_into_messages(list(run)):
+                publications.append(
+                    (contained, text_steps(bot, channel_id, text, contained))
+                )
+
+    for i, (contained, steps) in enumerate(publications):
+        for send, unsent in steps:
+            try:
+                await send()
+            except TelegramError:
+                unsent = unsent + [
+                    it for later, _ in publications[i + 1 :] for it in later
+                ]
+                state.requeue_publications(unsent)
+                raise
+
+        published += len(contained)
+
+    return published
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from typing import Optional
+
+# Telegram allows about 30 messages per second across all chats. The send
+# queue and broadcasts share one budget below that, so the replies handlers
+# send directly still get through.
+GLOBAL_RATE = 25
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def pause(self, seconds: float) -> None:
+        # Telegram asked to slow down: nothing goes out until then, and the
+        # burst allowance starts over afterwards
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+_rate_limiter: Optional[TokenBucket] = None
+
+
+def init_rate_limiter(rate: float = GLOBAL_RATE) -> TokenBucket:
+    global _rate_limiter
+    _rate_limiter = TokenBucket(rate)
+    return _rate_limiter
+
+
+def get_rate_limiter() -> TokenBucket:
+    if _rate_limiter is None:
+        raise RuntimeError("Rate limiter was not initialized")
+    return _rate_limiter
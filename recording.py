@@ -0,0 +1,25 @@
+import json
+from typing import IO, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import get_config
+
+# With RECORD_UPDATES set, every update is appended to that file as one JSON
+# line before any handler sees it, so scripts/replay.py can play the same
+# sequence back. The lines hold user ids and messages as Telegram sent them.
+
+_file: Optional[IO[str]] = None
+
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    global _file
+
+    if _file is None:
+        path = get_config().record_updates
+        assert path is not None
+        _file = open(path, "a", encoding="utf-8")
+
+    _file.write(json.dumps(update.to_dict(), ensure_ascii=False) + "\n")
+    _file.flush()
@@ -1,8 +1,13 @@
 import re
 
-RX_ANON = re.compile(r"\s*intenção anônima:\s*(.*)", re.I | re.S)
+# Labels in every language of locales/
+RX_ANON = re.compile(
+    r"\s*(?:intenção anônima|anonymous intention):\s*(.*)", re.I | re.S
+)
 RX_DASH = re.compile(r"\s*(.+)\s-\s(.*)", re.S)
-RX_LABELED = re.compile(r"\s*nome:\s*(.*\S)\s*[\n]+intenção:(.*)", re.I | re.S)
+RX_LABELED = re.compile(
+    r"\s*(?:nome|name):\s*(.*\S)\s*[\n]+(?:intenção|intention):(.*)", re.I | re.S
+)
 
 
 def parse_named_intention(text: str) -> dict | None:
@@ -0,0 +1,132 @@
+import html as _html
+import re
+from typing import Any
+
+from telegram import Bot, Message
+from telegram.constants import MessageLimit
+
+from i18n import renderer
+
+# Everything sent with parse_mode="HTML" is built and sent through here:
+# html() escapes the fields interpolated into a template, send_html() and
+# edit_html() split whatever is longer than Telegram allows without breaking
+# tags or entities.
+
+
+class Html(str):
+    # Markup built by the bot itself (e.g. a link), interpolated as is
+    pass
+
+
+def escape(text: str) -> str:
+    # Almost nothing users write needs escaping, and looking is much cheaper
+    # than html.escape()
+    if "<" not in text and ">" not in text and "&" not in text:
+        return text
+    return _html.escape(text, quote=False)
+
+
+def _escape_field(value: Any) -> Any:
+    if isinstance(value, Html) or isinstance(value, (int, float)):
+        return value
+    return escape(str(value))
+
+
+def html(locale: str, key: str, /, **fields) -> str:
+    return renderer(locale, key)({k: _escape_field(v) for k, v in fields.items()})
+
+
+_TOKEN = re.compile(r"<(/?)([a-zA-Z]+)[^>]*>|&#?\w+;|[^<&]+|[<&]")
+
+
+def split_html(text: str, limit: int = MessageLimit.MAX_TEXT_LENGTH) -> list[str]:
+    # The limit is on visible characters: tags don't count, entities count
+    # as one. Chunks close the tags still open where they're cut, and the
+    # next chunk opens them again.
+    if len(text) <= limit:
+        return [text]
+
+    chunks: list[str] = []
+    open_tags: list[tuple[str, str]] = []
+    current: list[str] = []
+    size = 0
+    blank = True
+
+    def close_chunk():
+        nonlocal current, size, blank
+        if not blank:
+            closing = "".join(f"</{name}>" for name, _ in reversed(open_tags))
+            chunks.append("".join(current) + closing)
+        current = [tag for _, tag in open_tags]
+        size = 0
+        blank = True
+
+    for m in _TOKEN.finditer(text):
+        token = m.group(0)
+
+        if m.group(2) is not None:
+            name = m.group(2).lower()
+            if not m.group(1):
+                open_tags.append((name, token))
+            elif open_tags and open_tags[-1][0] == name:
+                open_tags.pop()
+            current.append(token)
+            continue
+
+        if token[0] == "&" and len(token) > 1:
+            if size + 1 > limit:
+                close_chunk()
+            current.append(token)
+            size += 1
+            blank = False
+            continue
+
+        while size + len(token) > limit:
+            # Prefer breaking at a line break, then at a space, then before
+            # this run of text; cut mid-word only if the run alone is too long
+            room = limit - size
+            cut = token.rfind("\n", 0, room)
+            if cut <= 0:
+                cut = token.rfind(" ", 0, room)
+            if cut <= 0:
+                cut = 0 if size else room
+
+            if cut:
+                current.append(token[:cut])
+                blank = blank and not token[:cut].strip()
+            close_chunk()
+            token = token[cut:].lstrip()
+
+        if token:
+            current.append(token)
+            size += len(token)
+            blank = blank and not token.strip()
+
+    close_chunk()
+
+    return chunks
+
+
+async def send_html(
+    bot: Bot, chat_id: int, text: str, reply_markup: Any = None, **kwargs
+) -> Message:
+    # The keyboard goes on the last message
+    chunks = split_html(text)
+
+    for chunk in chunks[:-1]:
+        await bot.send_message(chat_id, chunk, parse_mode="HTML", **kwargs)
+
+    return await bot.send_message(
+        chat_id, chunks[-1], parse_mode="HTML", reply_markup=reply_markup, **kwargs
+    )
+
+
+async def edit_html(message: Message, text: str, reply_markup: Any = None) -> None:
+    # A message can't be edited into several; what doesn't fit is sent as
+    # replies to it
+    first, *rest = split_html(text)
+
+    await message.edit_text(first, parse_mode="HTML", reply_markup=reply_markup)
+
+    for chunk in rest:
+        await message.reply_text(chunk, parse_mode="HTML")
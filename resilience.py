@@ -0,0 +1,230 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import redis
+from redis.backoff import ExponentialWithJitterBackoff, NoBackoff
+from redis.retry import Retry
+
+import metrics
+from state import BotState
+
+
+class StateUnavailableError(Exception):
+    pass
+
+
+def create_redis_client(host: str, port: int) -> redis.Redis:
+    pool = redis.ConnectionPool(
+        host=host,
+        port=port,
+        decode_responses=True,
+        max_connections=8,
+        socket_timeout=1.0,
+        socket_connect_timeout=1.0,
+        socket_keepalive=True,
+        health_check_interval=30,
+        # Only retries connection errors and timeouts
+        retry=Retry(ExponentialWithJitterBackoff(cap=0.5, base=0.05), retries=2),
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        on_close: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._on_close = on_close
+        self._failures = 0
+        self._opened_at = 0.0
+
+        metrics.set_gauge(f"{self.name}_breaker_state", self.state)
+
+    def allow(self) -> bool:
+        if (
+            self.state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            # Let calls through again; the next one decides whether we close
+            # or go back to open
+            self._transition(self.HALF_OPEN)
+
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._transition(self.OPEN)
+
+    def _transition(self, new_state: str) -> None:
+        old_state, self.state = self.state, new_state
+
+        metrics.inc(f"{self.name}_breaker_transitions{{{old_state}->{new_state}}}")
+        metrics.set_gauge(f"{self.name}_breaker_state", new_state)
+        print(
+            f"ANONYMOUS INTENTIONS BOT: {self.name} breaker {old_state} -> {new_state}"
+        )
+
+        if new_state == self.CLOSED and self._on_close is not None:
+            self._on_close()
+
+
+_MISSING = object()
+
+
+class ResilientBotState(BotState):
+    # BotState behind a circuit breaker. While Redis is unreachable the reads
+    # below are answered with the last value seen for the same arguments;
+    # everything else raises StateUnavailableError.
+
+    CACHED_READS = frozenset(
+        (
+            "get_outbox_chat_id",
+            "get_ban_token_by_user",
+            "is_user_banned",
+            "get_ban_info_by_ban_token",
+        )
+    )
+
+    # Answer for cached reads that were never seen before the outage. Unknown
+    # users are let through rather than locking everyone out.
+    DEGRADED_DEFAULTS: dict[str, Any] = {
+        "get_ban_token_by_user": None,
+        "is_user_banned": False,
+    }
+
+    def __init__(
+        self, redis_client: redis.Redis, user_hash_key: bytes, cache_size: int = 10_000
+    ):
+        super().__init__(redis_client, user_hash_key)
+        self._cache: OrderedDict[tuple, Any] = OrderedDict()
+        self._cache_size = cache_size
+        self.breaker = CircuitBreaker("redis", on_close=self._resync)
+
+        # Calls block the event loop for as long as they take. Retrying is
+        # worth it while Redis is healthy, but once a call has failed the
+        # next ones fail fast until the breaker opens or one succeeds.
+        self._retry = redis_client.get_retry()
+        self._retrying = True
+
+    def _call(self, name: str, method: Callable, args: tuple, kwargs: dict) -> Any:
+        key = (name, args, tuple(sorted(kwargs.items())))
+        error: Optional[Exception] = None
+
+        if self.breaker.allow():
+            try:
+                value = method(self, *args, **kwargs)
+            except redis.RedisError as e:
+                metrics.inc("redis_errors")
+                self.breaker.record_failure()
+                self._set_retrying(False)
+                error = e
+            else:
+                self.breaker.record_success()
+                self._set_retrying(True)
+                if name in self.CACHED_READS:
+                    self._remember(key, value)
+                elif name == "get_guard_info":
+                    self._remember_guard_info(args, value)
+                else:
+                    self._forget_after_write(name, args)
+                return value
+
+        if name in self.CACHED_READS:
+            value = self._cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = self.DEGRADED_DEFAULTS.get(name, _MISSING)
+            if value is not _MISSING:
+                metrics.inc("redis_fallback_reads")
+                return value
+
+        metrics.inc("redis_rejected_calls")
+        raise StateUnavailableError(f"Redis is unavailable ({name})") from error
+
+    def _set_retrying(self, retrying: bool) -> None:
+        if retrying == self._retrying or self._retry is None:
+            return
+        self._retrying = retrying
+        self._r.set_retry(self._retry if retrying else Retry(NoBackoff(), 0))
+
+    def _remember(self, key: tuple, value: Any) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _remember_guard_info(self, args: tuple, value: Any) -> None:
+        # It stands in for two cached reads on every update, so it keeps them
+        # warm for when Redis goes away; it's not cached itself
+        outbox_chat_id, ban_token = value
+        self._remember(("get_outbox_chat_id", (), ()), outbox_chat_id)
+        if args[0] is not None:
+            self._remember(("get_ban_token_by_user", (args[0],), ()), ban_token)
+
+    def _forget_after_write(self, name: str, args: tuple) -> None:
+        # Drop cached reads that a successful write may have made stale
+        if name == "set_outbox_chat_id":
+            self._forget(lambda k: k[0] == "get_outbox_chat_id")
+        elif name == "ban_user":
+            user_id = args[0]
+            self._forget(
+                lambda k: k[0] in ("get_ban_token_by_user", "is_user_banned")
+                and k[1] == (user_id,)
+            )
+        elif name == "unban_user":
+            ban_token = args[0]
+            self._forget(
+                lambda k: k[1] == (ban_token,)
+                or (k[0] == "get_ban_token_by_user" and self._cache[k] == ban_token)
+                or k[0] == "is_user_banned"
+            )
+
+    def _forget(self, predicate: Callable[[tuple], bool]) -> None:
+        for key in [k for k in self._cache if predicate(k)]:
+            del self._cache[key]
+
+    def _resync(self) -> None:
+        # Back online: whatever was cached may have changed in the meantime
+        self._cache.clear()
+        metrics.inc("redis_resyncs")
+        try:
+            self.get_outbox_chat_id()
+        except StateUnavailableError:
+            pass
+
+
+def _guarded(name: str) -> Callable:
+    method = getattr(BotState, name)
+
+    def wrapper(self: ResilientBotState, *args, **kwargs):
+        return self._call(name, method, args, kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+# Every public BotState method goes through the breaker, including the ones
+# added later on
+for _name, _attr in vars(BotState).items():
+    if callable(_attr) and not _name.startswith("_") and _name != "close":
+        setattr(ResilientBotState, _name, _guarded(_name))
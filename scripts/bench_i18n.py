@@ -0,0 +1,113 @@
+"""Rendering cost of localized messages against the inline f-strings they replaced.
+
+For a few representative messages, times four ways of producing the same
+text: the f-string the handler used to build inline, t() with the compiled
+catalog, the compiled template resolved once with template() (what lists
+rendering one line per item use), and a plain str.format() of the catalog
+template (what t() would cost without compiling). Outputs are checked to be
+identical first.
+
+For scale, it also times encoding the sendMessage request body for each
+message, which the bot does for every message it sends anyway.
+
+    python scripts/bench_i18n.py
+    python scripts/bench_i18n.py --number 500000 --locale en
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from i18n import init_i18n, load_catalog, t, template  # noqa: E402
+
+FIELDS = {
+    "intention": "Pela saúde do meu pai, que está internado há duas semanas.",
+    "admin_name": "Maria",
+    "reason": "Contém nome completo",
+    "ban_token": "4f2a9c1e0b7d3a6f8e5c2b1a0d9f8e7c6b5a4f3e",
+    "count": 12,
+    "age": "2h 15min",
+    "label": "#4242",
+}
+
+# The inline f-strings from before the catalog, in the default locale
+BASELINES = {
+    "pong": lambda: "Pong.",
+    "outcome.rejected": lambda intention, reason: (
+        f"<pre>{intention}</pre>\n\n❌ A intenção acima foi rejeitada.\n\nMotivo: <i>{reason}</i>"
+    ),
+    "admin.banned": lambda intention, admin_name, reason, ban_token: (
+        f"{intention}\n\n—\n\n🔨 O remetente desta intenção foi banido por {admin_name}. Motivo: <i>{reason}</i>\n\n<code>{ban_token}</code>\n\n"
+    ),
+    "queue.header": lambda count: f"📥 Intenções pendentes: <b>{count}</b>",
+    "reminder.item": lambda label, age: f"• {label} — há {age}",
+}
+
+
+def fields_for(template: str) -> dict:
+    return {name: value for name, value in FIELDS.items() if f"{{{name}" in template}
+
+
+def bench(fn, number: int) -> float:
+    # Best of 5, in nanoseconds per call
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--locale", default="pt")
+    args = parser.parse_args()
+
+    init_i18n("pt", "pt")
+    catalog = load_catalog(args.locale)
+
+    print(
+        f"{'message':<20} {'f-string':>10} {'t()':>10} {'template':>10} "
+        f"{'format':>10} {'request':>10}  (ns/call)"
+    )
+
+    totals = [0.0] * 5
+    for key, baseline in BASELINES.items():
+        fields = fields_for(catalog[key])
+        text = catalog[key]
+        compiled = template(args.locale, key)
+
+        if args.locale == "pt":
+            assert baseline(**fields) == t("pt", key, **fields), key
+        assert text.format(**fields) == t(args.locale, key, **fields), key
+        assert compiled(**fields) == t(args.locale, key, **fields), key
+
+        payload = {
+            "chat_id": -1001234567890,
+            "text": t(args.locale, key, **fields),
+            "parse_mode": "HTML",
+        }
+
+        results = [
+            bench(lambda: baseline(**fields), args.number),
+            bench(lambda: t(args.locale, key, **fields), args.number),
+            bench(lambda: compiled(**fields), args.number),
+            bench(lambda: text.format(**fields), args.number),
+            bench(lambda: json.dumps(payload), args.number),
+        ]
+        totals = [a + b for a, b in zip(totals, results)]
+
+        print(f"{key:<20} " + " ".join(f"{r:>10.0f}" for r in results))
+
+    print(f"{'total':<20} " + " ".join(f"{r:>10.0f}" for r in totals))
+    request = totals[4] / len(BASELINES)
+    for name, total in (("t()", totals[1]), ("template()", totals[2])):
+        per_message = (total - totals[0]) / len(BASELINES)
+        print(
+            f"{name} costs {per_message:+.0f} ns per message over the inline "
+            f"f-string, {per_message / request:.0%} of encoding its request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Cold start time and RSS of the bot, measured in fresh interpreters.
+
+Each run spawns a new Python process that builds the application exactly like
+main.py does (without starting to poll) and reports how long that took and
+its peak RSS. Use --eager to also import every handler module up front, which
+is what the bot did before handlers were loaded lazily.
+
+    python scripts/bench_startup.py --runs 20
+    python scripts/bench_startup.py --runs 20 --eager
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+from main import build_application
+from config import get_config
+if {eager}:
+    import handlers.admin, handlers.private
+build_application(get_config())
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "rss_kb": rss_kb, "modules": len(sys.modules)}}))
+"""
+
+DUMMY_ENV = {
+    "TELEGRAM_BOT_TOKEN": "123456:benchmark",
+    "ACTIVATION_PASSWORD": "benchmark",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "PUBLISH_CHANNEL_ID": "-1001",
+    "USER_HASH_KEY": "benchmark",
+}
+
+
+def run_once(eager: bool) -> dict:
+    env = {**os.environ, **DUMMY_ENV}
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(eager=eager)],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--eager", action="store_true")
+    args = parser.parse_args()
+
+    # Warm the OS page cache and bytecode cache, we want interpreter cold
+    # starts, not disk cold starts
+    run_once(args.eager)
+
+    results = [run_once(args.eager) for _ in range(args.runs)]
+    seconds = [r["seconds"] * 1000 for r in results]
+    rss = [r["rss_kb"] / 1024 for r in results]
+
+    print(f"mode:     {'eager' if args.eager else 'lazy'}")
+    print(f"runs:     {args.runs}")
+    print(
+        f"startup:  median {statistics.median(seconds):.1f} ms, "
+        f"min {min(seconds):.1f} ms, max {max(seconds):.1f} ms"
+    )
+    print(f"peak RSS: median {statistics.median(rss):.1f} MiB")
+    print(f"modules:  {results[-1]['modules']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,669 @@
+"""Replays update sequences against fakeredis and a fake Bot API.
+
+Recordings are written by the bot itself when RECORD_UPDATES is set. Replay
+feeds them through the real handlers as fast as they'll go and reports the
+throughput, so it also works as a regression benchmark:
+
+    python scripts/replay.py updates.jsonl
+    python scripts/replay.py updates.jsonl --repeat 20
+
+Without a recording, --synthetic runs N users through the whole flow
+(/start, intention, confirm, admin accepts) and then the admins chatting in
+the group:
+
+    python scripts/replay.py --synthetic 500
+
+--fuzz has Hypothesis generate the sequences instead, including the awkward
+ones (confirming twice, pressing buttons of stale messages, restarting
+between steps, deciding the same intention twice), and checks the
+invariants of IntentionFlow after every step:
+
+    python scripts/replay.py --fuzz 200
+
+Needs the packages in requirements-dev.txt.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+OUTBOX_CHAT_ID = -100100
+PUBLISH_CHANNEL_ID = -100200
+
+os.environ.update(
+    {
+        "TELEGRAM_BOT_TOKEN": "123456:replay",
+        "ACTIVATION_PASSWORD": "replay",
+        "REDIS_HOST": "localhost",
+        "REDIS_PORT": "6379",
+        "PUBLISH_CHANNEL_ID": str(PUBLISH_CHANNEL_ID),
+        "USER_HASH_KEY": "replay",
+        "PUBLISH_TIMES": "",
+        "REMINDER_AFTER_HOURS": "0",
+        "ARCHIVE_DIR": tempfile.mkdtemp(prefix="replay-archive-"),
+    }
+)
+# Replaying must not record the replay
+os.environ.pop("RECORD_UPDATES", None)
+
+import fakeredis  # noqa: E402
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest, RequestData  # noqa: E402
+
+from config import get_config  # noqa: E402
+from main import build_application  # noqa: E402
+from ratelimit import init_rate_limiter  # noqa: E402
+from sendqueue import get_send_queue  # noqa: E402
+from state import get_state  # noqa: E402
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Bot", "username": "bot"}
+ADMIN = {"id": 7, "is_bot": False, "first_name": "Admin", "language_code": "pt"}
+
+
+def chat(chat_id: int) -> dict:
+    if chat_id > 0:
+        return {"id": chat_id, "type": "private"}
+    return {"id": chat_id, "type": "supergroup", "title": "Chat"}
+
+
+class FakeBotApi(BaseRequest):
+    # Answers every Bot API call locally. Sent messages get ids per chat, as
+    # in Telegram, and are kept both as sent and as last edited, so later
+    # updates can press their buttons or reply to them.
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+        self.sent: dict[int, list[dict]] = defaultdict(list)
+        self.current: dict[tuple[int, int], dict] = {}
+        self._last_message_id: Counter[int] = Counter()
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        **kwargs: Any,
+    ) -> tuple[int, bytes]:
+        name = url.rsplit("/", 1)[1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls[name] += 1
+        result = self._answer(name, params)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def _answer(self, name: str, params: dict) -> Any:
+        if name == "getMe":
+            return BOT_USER
+
+        if name == "sendMediaGroup":
+            return [
+                self._store(params["chat_id"], {"caption": item.get("caption")})
+                for item in params["media"]
+            ]
+
+        if name.startswith("send"):
+            fields = ("text", "caption", "reply_markup")
+            return self._store(
+                params["chat_id"], {k: params[k] for k in fields if k in params}
+            )
+
+        if name in ("editMessageText", "editMessageReplyMarkup"):
+            key = (params["chat_id"], params["message_id"])
+            # Recordings refer to messages the real API sent
+            message = dict(
+                self.current.get(key)
+                or {
+                    "message_id": params["message_id"],
+                    "date": int(time.time()),
+                    "chat": chat(params["chat_id"]),
+                    "from": BOT_USER,
+                }
+            )
+            if "text" in params:
+                message["text"] = params["text"]
+            if "reply_markup" in params:
+                message["reply_markup"] = params["reply_markup"]
+            else:
+                message.pop("reply_markup", None)
+            self.current[key] = message
+            return message
+
+        return True
+
+    def next_message_id(self, chat_id: int) -> int:
+        self._last_message_id[chat_id] += 1
+        return self._last_message_id[chat_id]
+
+    def _store(self, chat_id: int, fields: dict) -> dict:
+        message = {
+            "message_id": self.next_message_id(chat_id),
+            "date": int(time.time()),
+            "chat": chat(chat_id),
+            "from": BOT_USER,
+            **{k: v for k, v in fields.items() if v is not None},
+        }
+        self.sent[chat_id].append(message)
+        self.current[(chat_id, message["message_id"])] = message
+        return message
+
+    def with_button(self, chat_id: int, callback_prefix: str) -> list[dict]:
+        # Messages as they were sent, so buttons that were edited away since
+        # can still be pressed (a double tap, or a slow client)
+        return [
+            message
+            for message in self.sent[chat_id]
+            if any(
+                button.get("callback_data", "").startswith(callback_prefix)
+                for row in message.get("reply_markup", {}).get("inline_keyboard", [])
+                for button in row
+            )
+        ]
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    # Counts commands and round-trips; a pipeline is one round-trip
+
+    commands = 0
+    round_trips = 0
+
+    def execute_command(self, *args, **options):
+        self.commands += 1
+        self.round_trips += 1
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(raise_on_error: bool = True):
+            self.commands += len(pipe.command_stack)
+            self.round_trips += 1
+            return execute(raise_on_error)
+
+        pipe.execute = counted_execute
+        return pipe
+
+
+class UpdateFactory:
+    def __init__(self, api: FakeBotApi):
+        self._api = api
+        self._last_update_id = 0
+        self._last_query_id = 0
+
+    def _update(self, **fields: Any) -> dict:
+        self._last_update_id += 1
+        return {"update_id": self._last_update_id, **fields}
+
+    def message(
+        self, user: dict, chat_id: int, text: str, reply_to: Optional[dict] = None
+    ) -> dict:
+        message = {
+            "message_id": self._api.next_message_id(chat_id),
+            "date": int(time.time()),
+            "chat": chat(chat_id),
+            "from": user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split(None, 1)[0]
+            message["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(command)}
+            ]
+        if reply_to is not None:
+            message["reply_to_message"] = reply_to
+        return self._update(message=message)
+
+    def press(self, user: dict, message: dict, callback_data: str) -> dict:
+        self._last_query_id += 1
+        return self._update(
+            callback_query={
+                "id": str(self._last_query_id),
+                "from": user,
+                "chat_instance": str(message["chat"]["id"]),
+                "data": callback_data,
+                "message": message,
+            }
+        )
+
+
+class Harness:
+    # The bot as main.py builds it, on fakeredis and FakeBotApi. Restarting
+    # keeps Redis, like restarting the real bot does.
+
+    def __init__(self):
+        self.redis = CountingRedis(server=fakeredis.FakeServer(), decode_responses=True)
+        self.api = FakeBotApi()
+        self.updates = UpdateFactory(self.api)
+        self.errors: list[BaseException] = []
+
+    async def start(self) -> None:
+        self.application = build_application(get_config(), self.redis, self.api)
+        self.application.add_error_handler(self._record_error)
+        # The fake Bot API has no flood limit to stay under
+        init_rate_limiter(math.inf)
+        await self.application.initialize()
+        await self.application.start()
+        get_send_queue().start()
+
+    async def stop(self) -> None:
+        await get_send_queue().drain(10)
+        await self.application.stop()
+        await self.application.shutdown()
+
+    async def restart(self) -> None:
+        await self.stop()
+        await self.start()
+
+    async def feed(self, update: dict) -> None:
+        await self.application.process_update(
+            Update.de_json(update, self.application.bot)
+        )
+
+    async def settle(self) -> None:
+        await get_send_queue().join()
+
+    async def _record_error(self, update: object, context: Any) -> None:
+        assert context.error is not None
+        self.errors.append(context.error)
+
+
+def report(
+    label: str, harness: Harness, updates: int, elapsed: float, cpu: float
+) -> None:
+    # Redis and the Bot API are in-process here, so CPU time includes
+    # fakeredis; the round-trip count is what would cost latency for real
+    print(f"{label}: {updates} update(s) in {elapsed:.3f}s")
+    print(
+        f"  {updates / elapsed:,.0f} updates/s, {elapsed / updates * 1e6:,.0f}µs "
+        f"each ({cpu / updates * 1e6:,.0f}µs CPU)"
+    )
+    print(
+        f"  Redis: {harness.redis.commands / updates:.2f} commands and "
+        f"{harness.redis.round_trips / updates:.2f} round-trips per update"
+    )
+    print(
+        f"  Bot API: {sum(harness.api.calls.values()) / updates:.2f} calls per update"
+    )
+    if harness.errors:
+        print(f"  {len(harness.errors)} error(s), first: {harness.errors[0]!r}")
+
+
+def first_group_chat_id(updates: list[dict]) -> Optional[int]:
+    for update in updates:
+        for kind in ("message", "edited_message", "callback_query"):
+            item = update.get(kind)
+            if item is None:
+                continue
+            message = item.get("message", item)
+            chat_id = message.get("chat", {}).get("id")
+            if chat_id is not None and chat_id < 0:
+                return chat_id
+    return None
+
+
+async def replay_recording(
+    path: str, repeat: int, outbox_chat_id: Optional[int]
+) -> None:
+    with open(path, encoding="utf-8") as f:
+        updates = [json.loads(line) for line in f if line.strip()]
+
+    if not updates:
+        sys.exit(f"{path} has no updates")
+
+    harness = Harness()
+    await harness.start()
+    # The recording doesn't include the bot's state, only which group it
+    # talked to
+    outbox_chat_id = outbox_chat_id or first_group_chat_id(updates)
+    if outbox_chat_id is not None:
+        get_state().set_outbox_chat_id(outbox_chat_id)
+    harness.redis.commands = harness.redis.round_trips = 0
+
+    start, start_cpu = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        for update in updates:
+            await harness.feed(update)
+    await harness.settle()
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - start_cpu
+
+    report(path, harness, len(updates) * repeat, elapsed, cpu)
+    await harness.stop()
+
+
+async def replay_synthetic(users: int) -> None:
+    harness = Harness()
+    await harness.start()
+    get_state().set_outbox_chat_id(OUTBOX_CHAT_ID)
+    harness.redis.commands = harness.redis.round_trips = 0
+    api, make = harness.api, harness.updates
+    fed = 0
+
+    start, start_cpu = time.perf_counter(), time.process_time()
+    for i in range(users):
+        user = {
+            "id": 1000 + i,
+            "is_bot": False,
+            "first_name": f"User {i}",
+            "language_code": ("pt", "en", "es")[i % 3],
+        }
+        user_id = user["id"]
+
+        await harness.feed(make.message(user, user_id, "/start"))
+        await harness.feed(make.message(user, user_id, f"Pela saúde da família {i}."))
+        # The last message in each chat is the one to press
+        confirmation = api.sent[user_id][-1]
+        await harness.feed(make.press(user, confirmation, "confirm_send"))
+        outbox_message = api.sent[OUTBOX_CHAT_ID][-1]
+        accept = outbox_message["reply_markup"]["inline_keyboard"][0][0]
+        await harness.feed(make.press(ADMIN, outbox_message, accept["callback_data"]))
+        fed += 4
+    await harness.settle()
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - start_cpu
+
+    report(f"synthetic ({users} users)", harness, fed, elapsed, cpu)
+
+    # Most of what the bot sees in the group is the admins talking among
+    # themselves, which none of its handlers act on
+    harness.redis.commands = harness.redis.round_trips = 0
+    harness.api.calls.clear()
+    start, start_cpu = time.perf_counter(), time.process_time()
+    for i in range(users):
+        await harness.feed(make.message(ADMIN, OUTBOX_CHAT_ID, f"Mensagem {i}"))
+    await harness.settle()
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - start_cpu
+
+    report(f"group chatter ({users} messages)", harness, users, elapsed, cpu)
+    await harness.stop()
+
+
+def intention_flow() -> type:
+    # The state machine --fuzz runs, also run by tests/test_flow.py. Needs
+    # hypothesis, which only the dev requirements install.
+    from hypothesis import strategies as st
+    from hypothesis.stateful import (
+        RuleBasedStateMachine,
+        invariant,
+        precondition,
+        rule,
+    )
+
+    users = [
+        {"id": 11, "is_bot": False, "first_name": "Ana", "language_code": "pt"},
+        {"id": 12, "is_bot": False, "first_name": "Ben", "language_code": "en"},
+        {"id": 13, "is_bot": False, "first_name": "Chi"},
+    ]
+    texts = st.sampled_from(
+        [
+            "Pela saúde do meu pai",
+            "Nome: João\n\nIntenção: pela Maria",
+            "João - pela Maria",
+            "Intenção anônima: <b>pelos</b> & pelas",
+            "For my mother's health",
+        ]
+    )
+
+    class IntentionFlow(RuleBasedStateMachine):
+        # The model is what the handlers should end up doing: who has an
+        # intention waiting for confirmation, which outbox messages were
+        # decided and which of those accepted
+
+        def __init__(self):
+            super().__init__()
+            self.loop = asyncio.new_event_loop()
+            self.harness = Harness()
+            self.run(self.harness.start())
+            get_state().set_outbox_chat_id(OUTBOX_CHAT_ID)
+
+            self.awaiting_confirmation: dict[int, bool] = defaultdict(bool)
+            self.banned: set[int] = set()
+            self.submissions = 0
+            self.decided: set[int] = set()
+            self.accepted: set[int] = set()
+            self.nonce = 0
+
+        def run(self, coro):
+            return self.loop.run_until_complete(coro)
+
+        def feed(self, update: dict) -> None:
+            self.run(self.harness.feed(update))
+            self.run(self.harness.settle())
+
+        def teardown(self):
+            self.run(self.harness.stop())
+            self.loop.close()
+
+        def pressable(self, callback_prefix: str) -> list[tuple[dict, dict]]:
+            # (user, message) for every message any user could press it on;
+            # rules draw from these, so they only run when there's one
+            return [
+                (user, message)
+                for user in users
+                for message in self.harness.api.with_button(user["id"], callback_prefix)
+            ]
+
+        def outbox_intentions(self) -> list[dict]:
+            return self.harness.api.with_button(OUTBOX_CHAT_ID, "admin_accept")
+
+        def sender_of(self, outbox_message: dict) -> int:
+            accept = outbox_message["reply_markup"]["inline_keyboard"][0][0]
+            return int(accept["callback_data"].split(":")[1])
+
+        # --- Users ---
+
+        @rule(user=st.sampled_from(users), text=texts)
+        def send_intention(self, user, text):
+            # Distinct texts, so every publication can be traced back
+            self.nonce += 1
+            text = f"{text} #{self.nonce}."
+            self.feed(self.harness.updates.message(user, user["id"], text))
+            if user["id"] not in self.banned:
+                self.awaiting_confirmation[user["id"]] = True
+
+        @precondition(lambda self: self.pressable("confirm_send"))
+        @rule(action=st.sampled_from(["confirm_send", "cancel_send"]), data=st.data())
+        def press_confirmation(self, action, data):
+            user, message = data.draw(st.sampled_from(self.pressable(action)))
+
+            self.feed(self.harness.updates.press(user, message, action))
+
+            if user["id"] in self.banned:
+                return
+            # Whichever confirmation message it was, it acts on the
+            # intention waiting now, if any
+            if self.awaiting_confirmation[user["id"]] and action == "confirm_send":
+                self.submissions += 1
+            self.awaiting_confirmation[user["id"]] = False
+
+        @precondition(lambda self: self.pressable("new_intention"))
+        @rule(data=st.data())
+        def press_new_intention(self, data):
+            user, message = data.draw(st.sampled_from(self.pressable("new_intention")))
+
+            self.feed(self.harness.updates.press(user, message, "new_intention"))
+            if user["id"] not in self.banned:
+                self.awaiting_confirmation[user["id"]] = False
+
+        @rule()
+        def restart(self):
+            self.run(self.harness.restart())
+
+        # --- Admins ---
+
+        @precondition(lambda self: self.outbox_intentions())
+        @rule(data=st.data())
+        def press_accept(self, data):
+            message = data.draw(st.sampled_from(self.outbox_intentions()))
+            accept = message["reply_markup"]["inline_keyboard"][0][0]
+
+            self.feed(
+                self.harness.updates.press(ADMIN, message, accept["callback_data"])
+            )
+
+            if message["message_id"] not in self.decided:
+                self.decided.add(message["message_id"])
+                self.accepted.add(message["message_id"])
+
+        @precondition(lambda self: self.outbox_intentions())
+        @rule(data=st.data(), command=st.sampled_from(["/reject", "/ban"]))
+        def reply_with_decision(self, data, command):
+            sent = data.draw(st.sampled_from(self.outbox_intentions()))
+            # Replies carry the message as it is now
+            current = self.harness.api.current[(OUTBOX_CHAT_ID, sent["message_id"])]
+
+            self.feed(
+                self.harness.updates.message(
+                    ADMIN, OUTBOX_CHAT_ID, f"{command} motivo", reply_to=current
+                )
+            )
+
+            if sent["message_id"] not in self.decided:
+                self.decided.add(sent["message_id"])
+                if command == "/ban":
+                    self.banned.add(self.sender_of(sent))
+
+        @rule()
+        def bulk_accept(self):
+            self.feed(
+                self.harness.updates.message(ADMIN, OUTBOX_CHAT_ID, "/bulkaccept")
+            )
+
+            for message in self.outbox_intentions():
+                if message["message_id"] not in self.decided:
+                    self.decided.add(message["message_id"])
+                    self.accepted.add(message["message_id"])
+
+        @precondition(lambda self: self.outbox_intentions())
+        @rule(data=st.data())
+        def bulk_reject(self, data):
+            ids = sorted(m["message_id"] for m in self.outbox_intentions())
+            first = data.draw(st.sampled_from(ids))
+            last = data.draw(st.sampled_from([i for i in ids if i >= first]))
+
+            self.feed(
+                self.harness.updates.message(
+                    ADMIN, OUTBOX_CHAT_ID, f"/bulkreject {first}-{last} motivo"
+                )
+            )
+
+            self.decided.update(i for i in ids if first <= i <= last)
+
+        # --- Invariants ---
+
+        @invariant()
+        def no_errors(self):
+            assert not self.harness.errors, self.harness.errors
+
+        @invariant()
+        def one_outbox_message_per_submission(self):
+            assert len(self.outbox_intentions()) == self.submissions
+
+        @invariant()
+        def every_intention_pending_or_handled(self):
+            state = get_state()
+            pending = {
+                int(m) for m in self.harness.redis.zrange(state.PENDING_KEY, 0, -1)
+            }
+            handled = {
+                int(m) for m in self.harness.redis.zrange(state.HANDLED_KEY, 0, -1)
+            }
+            sent = {m["message_id"] for m in self.outbox_intentions()}
+
+            assert not pending & handled
+            assert pending | handled == sent
+            assert handled == self.decided
+
+        @invariant()
+        def accepted_published_once(self):
+            published = [
+                m.get("text", "") for m in self.harness.api.sent[PUBLISH_CHANNEL_ID]
+            ]
+            queued = self.harness.redis.lrange(get_state().PUBLISH_QUEUE_KEY, 0, -1)
+
+            for message in self.outbox_intentions():
+                times = sum(
+                    entry.count(message["text"]) for entry in published + queued
+                )
+                expected = 1 if message["message_id"] in self.accepted else 0
+                assert times == expected, (message["text"], times)
+
+        @invariant()
+        def confirmation_state_matches(self):
+            user_data = self.harness.application.user_data
+            for user_id, waiting in self.awaiting_confirmation.items():
+                pending = user_data.get(user_id, {}).get("pending_intention")
+                assert (pending is not None) == waiting, user_id
+
+    return IntentionFlow
+
+
+def fuzz_settings(examples: int, steps: int) -> Any:
+    from hypothesis import HealthCheck, settings
+
+    return settings(
+        max_examples=examples,
+        stateful_step_count=steps,
+        deadline=None,
+        suppress_health_check=[HealthCheck.too_slow],
+    )
+
+
+def run_fuzz(examples: int, steps: int) -> None:
+    try:
+        from hypothesis.stateful import run_state_machine_as_test
+    except ImportError:
+        sys.exit("--fuzz needs hypothesis: pip install -r requirements-dev.txt")
+
+    start = time.perf_counter()
+    run_state_machine_as_test(intention_flow(), settings=fuzz_settings(examples, steps))
+    print(
+        f"fuzz: {examples} sequence(s) of up to {steps} steps passed in {time.perf_counter() - start:.1f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "recording", nargs="?", help="JSON lines written with RECORD_UPDATES"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--outbox-chat-id", type=int, help="default: the first group in the recording"
+    )
+    parser.add_argument("--synthetic", type=int, metavar="USERS")
+    parser.add_argument("--fuzz", type=int, metavar="EXAMPLES")
+    parser.add_argument(
+        "--steps", type=int, default=30, help="steps per fuzzed sequence"
+    )
+    args = parser.parse_args()
+
+    if args.fuzz:
+        run_fuzz(args.fuzz, args.steps)
+    elif args.synthetic:
+        asyncio.run(replay_synthetic(args.synthetic))
+    elif args.recording:
+        asyncio.run(replay_recording(args.recording, args.repeat, args.outbox_chat_id))
+    else:
+        parser.error("give a recording, --synthetic or --fuzz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from telegram.error import RetryAfter, TelegramError
+
+import metrics
+from ratelimit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+Send = Callable[[], Awaitable[Any]]
+
+# Flood control asks to wait and try again; past this many times the message
+# is given up on
+SEND_MAX_ATTEMPTS = 5
+
+
+class SendQueue:
+    # Outbound messages that don't need to block the handler that produced
+    # them (e.g. notifying a user that their intention was rejected) go
+    # through here, sent by a fixed number of workers. Bulk decisions notify
+    # hundreds of senders at once, so sends take from the global rate limit.
+
+    def __init__(self, concurrency: int = 8):
+        self._concurrency = concurrency
+        self._queue: asyncio.Queue[tuple[Send, int]] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._accepting = False
+        self._in_flight = 0
+        self.sent = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._accepting = True
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self._concurrency)
+        ]
+
+    def submit(self, send: Send) -> bool:
+        if not self._accepting:
+            return False
+        self._queue.put_nowait((send, 1))
+        return True
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def join(self) -> None:
+        # Waits until everything submitted so far was sent (or failed)
+        await self._queue.join()
+
+    async def _work(self) -> None:
+        while True:
+            send, attempt = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await get_rate_limiter().acquire()
+                await send()
+                self.sent += 1
+                metrics.inc("send_queue_sent")
+            except RetryAfter as e:
+                # Every worker holds off, then the message goes back in line
+                delay = e.retry_after
+                get_rate_limiter().pause(
+                    delay.total_seconds() if isinstance(delay, timedelta) else delay
+                )
+                metrics.inc("send_queue_retried")
+                if attempt < SEND_MAX_ATTEMPTS:
+                    self._queue.put_nowait((send, attempt + 1))
+                else:
+                    self._fail(e)
+            except TelegramError as e:
+                self._fail(e)
+            except Exception as e:
+                # A bug in one message must not take the worker down with it
+                self._fail(e)
+                logger.error("Unexpected error sending a message", exc_info=e)
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    def _fail(self, error: Exception) -> None:
+        self.failed += 1
+        metrics.inc("send_queue_failed")
+        print(f"ANONYMOUS INTENTIONS BOT: Send failed: {error}")
+
+    async def drain(self, timeout: float) -> tuple[int, int]:
+        # Stops accepting new messages and waits up to timeout seconds for
+        # the queued ones. Returns (drained, abandoned).
+        self._accepting = False
+        queued = self._queue.qsize() + self._in_flight
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        # Whatever is still being sent at this point gets cancelled below
+        abandoned = self._in_flight
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            abandoned += 1
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        return max(0, queued - abandoned), abandoned
+
+
+_send_queue: Optional[SendQueue] = None
+
+
+def init_send_queue(concurrency: int = 8) -> SendQueue:
+    global _send_queue
+    _send_queue = SendQueue(concurrency)
+    return _send_queue
+
+
+def get_send_queue() -> SendQueue:
+    if _send_queue is None:
+        raise RuntimeError("Send queue was not initialized")
+    return _send_queue
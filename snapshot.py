@@ -0,0 +1,304 @@
+import json
+import os
+from typing import IO, Any, Iterator
+
+import redis
+
+try:
+    import msgpack
+except ImportError:  # Optional, only needed for .msgpack snapshots
+    msgpack = None
+
+from state import BotState
+
+# Snapshots hold one record per Redis key:
+#
+#   {"k": <key>, "t": <redis type>, "v": <value>, "x": <ttl in ms or -1>}
+#
+# as JSON lines, or as a stream of msgpack maps when the file name ends in
+# .msgpack. Hashes, lists, sets and sorted sets with more members than the
+# batch size are split into several records; all but the first have "c": 1
+# and are added to the key instead of replacing it. Progress is checkpointed
+# next to the file after every batch so an interrupted export or import can
+# be picked up with --resume.
+
+COLLECTION_SIZES = {"hash": "hlen", "list": "llen", "set": "scard", "zset": "zcard"}
+
+
+def _is_msgpack(path: str) -> bool:
+    return path.endswith(".msgpack")
+
+
+def _read_progress(progress_path: str) -> dict | None:
+    try:
+        with open(progress_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_progress(progress_path: str, progress: dict) -> None:
+    tmp = f"{progress_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp, progress_path)
+
+
+def _require_msgpack() -> None:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed: pip install msgpack")
+
+
+# --- Export ---
+
+
+def _encode(records: list[dict], binary: bool) -> bytes:
+    if binary:
+        return b"".join(msgpack.packb(rec) for rec in records)
+    return "".join(
+        json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for rec in records
+    ).encode()
+
+
+def _is_gone(key_type: str, value: Any) -> bool:
+    # Redis has no empty collections; an empty one was deleted or expired
+    return value is None or (key_type != "string" and not value)
+
+
+def _read_whole(r: redis.Redis, keys: list[tuple[str, str, int]]) -> list[dict]:
+    pipe = r.pipeline(transaction=False)
+    for key, key_type, _ in keys:
+        if key_type == "string":
+            pipe.get(key)
+        elif key_type == "hash":
+            pipe.hgetall(key)
+        elif key_type == "list":
+            pipe.lrange(key, 0, -1)
+        elif key_type == "set":
+            pipe.smembers(key)
+        elif key_type == "zset":
+            pipe.zrange(key, 0, -1, withscores=True)
+    values = pipe.execute()
+
+    records = []
+    for (key, key_type, ttl), value in zip(keys, values):
+        if _is_gone(key_type, value):
+            # Expired since TYPE, e.g. the reminders lock or a pending
+            # intention
+            continue
+        if key_type == "set":
+            value = sorted(value)
+        elif key_type == "zset":
+            value = [[member, score] for member, score in value]
+        records.append({"k": key, "t": key_type, "v": value, "x": ttl})
+
+    return records
+
+
+def _iter_chunks(r: redis.Redis, key: str, key_type: str, size: int) -> Iterator:
+    # SCAN-family commands may return a member twice, which importing
+    # tolerates; they may also return empty pages, which are skipped
+    if key_type == "list":
+        start = 0
+        while True:
+            chunk = r.lrange(key, start, start + size - 1)
+            if chunk:
+                yield chunk
+            if len(chunk) < size:
+                return
+            start += size
+
+    cursor = 0
+    while True:
+        if key_type == "hash":
+            cursor, chunk = r.hscan(key, cursor, count=size)
+        elif key_type == "set":
+            cursor, members = r.sscan(key, cursor, count=size)
+            chunk = sorted(members)
+        else:
+            cursor, pairs = r.zscan(key, cursor, count=size)
+            chunk = [[member, score] for member, score in pairs]
+        if chunk:
+            yield chunk
+        if cursor == 0:
+            return
+
+
+def _export_batch(
+    r: redis.Redis, keys: list[str], batch_size: int, f: IO[bytes], binary: bool
+) -> int:
+    # Memory is bounded by the batch size in keys and in collection members:
+    # small keys are read whole, several per pipeline, and larger ones a
+    # chunk at a time. Returns the number of keys written.
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+        pipe.pttl(key)
+    meta = pipe.execute()
+    types, ttls = meta[0::2], meta[1::2]
+
+    # Expired between SCAN and TYPE ("none"), or a type we don't use
+    found = [
+        (key, key_type, ttl)
+        for key, key_type, ttl in zip(keys, types, ttls)
+        if key_type == "string" or key_type in COLLECTION_SIZES
+    ]
+
+    pipe = r.pipeline(transaction=False)
+    for key, key_type, _ in found:
+        if key_type == "string":
+            pipe.exists(key)
+        else:
+            getattr(pipe, COLLECTION_SIZES[key_type])(key)
+    sizes = pipe.execute()
+
+    written = 0
+    whole: list[tuple[str, str, int]] = []
+    members = 0
+
+    for (key, key_type, ttl), size in zip(found, sizes):
+        if size <= batch_size:
+            whole.append((key, key_type, ttl))
+            members += size
+            if members >= batch_size:
+                records = _read_whole(r, whole)
+                f.write(_encode(records, binary))
+                written += len(records)
+                whole, members = [], 0
+            continue
+
+        first = True
+        for chunk in _iter_chunks(r, key, key_type, batch_size):
+            record = {"k": key, "t": key_type, "v": chunk, "x": ttl}
+            if not first:
+                record["c"] = 1
+            f.write(_encode([record], binary))
+            first = False
+        written += not first
+
+    if whole:
+        records = _read_whole(r, whole)
+        f.write(_encode(records, binary))
+        written += len(records)
+
+    return written
+
+
+def export_state(
+    r: redis.Redis, path: str, batch_size: int = 1000, resume: bool = False
+) -> int:
+    binary = _is_msgpack(path)
+    if binary:
+        _require_msgpack()
+
+    progress_path = f"{path}.export-progress"
+    progress = _read_progress(progress_path) if resume else None
+    if progress is None:
+        progress = {"cursor": 0, "records": 0, "offset": 0, "done": False}
+    elif progress["done"]:
+        return progress["records"]
+
+    mode = "r+b" if progress["offset"] else "wb"
+    with open(path, mode) as f:
+        # Anything after the last checkpoint is a partially written batch
+        f.seek(progress["offset"])
+        f.truncate()
+
+        cursor = progress["cursor"]
+        while True:
+            cursor, keys = r.scan(cursor, match=BotState.KEY_PATTERN, count=batch_size)
+
+            if keys:
+                progress["records"] += _export_batch(r, keys, batch_size, f, binary)
+
+            f.flush()
+            progress["cursor"] = cursor
+            progress["offset"] = f.tell()
+            progress["done"] = cursor == 0
+            _write_progress(progress_path, progress)
+
+            if cursor == 0:
+                break
+
+    os.remove(progress_path)
+    return progress["records"]
+
+
+# --- Import ---
+
+
+def _iter_records(f: IO[bytes], binary: bool) -> Iterator[tuple[dict, int]]:
+    # Yields each record with the file offset right after it
+    if binary:
+        unpacker = msgpack.Unpacker(f, raw=False)
+        start = f.tell()
+        for record in unpacker:
+            yield record, start + unpacker.tell()
+    else:
+        for line in iter(f.readline, b""):
+            if line.strip():
+                yield json.loads(line), f.tell()
+
+
+def _write_record(pipe: Any, record: dict) -> None:
+    key, key_type, value, ttl = record["k"], record["t"], record["v"], record["x"]
+
+    if not record.get("c"):
+        pipe.delete(key)
+    if _is_gone(key_type, value):
+        # Exports from before expired keys were skipped may have them
+        return
+    if key_type == "string":
+        pipe.set(key, value)
+    elif key_type == "hash":
+        pipe.hset(key, mapping=value)
+    elif key_type == "list":
+        pipe.rpush(key, *value)
+    elif key_type == "set":
+        pipe.sadd(key, *value)
+    elif key_type == "zset":
+        pipe.zadd(key, {member: score for member, score in value})
+
+    if ttl is not None and ttl > 0 and not record.get("c"):
+        pipe.pexpire(key, ttl)
+
+
+def import_state(
+    r: redis.Redis, path: str, batch_size: int = 1000, resume: bool = False
+) -> int:
+    binary = _is_msgpack(path)
+    if binary:
+        _require_msgpack()
+
+    progress_path = f"{path}.import-progress"
+    progress = _read_progress(progress_path) if resume else None
+    if progress is None:
+        progress = {"records": 0, "offset": 0}
+
+    with open(path, "rb") as f:
+        f.seek(progress["offset"])
+
+        pipe = r.pipeline(transaction=False)
+        pending = 0
+        pending_keys = 0
+
+        for record, offset in _iter_records(f, binary):
+            _write_record(pipe, record)
+            pending += 1
+            pending_keys += not record.get("c")
+
+            if pending >= batch_size:
+                pipe.execute()
+                progress["records"] += pending_keys
+                progress["offset"] = offset
+                _write_progress(progress_path, progress)
+                pending = pending_keys = 0
+
+        if pending:
+            pipe.execute()
+            progress["records"] += pending_keys
+
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    return progress["records"]
@@ -1,12 +1,40 @@
 import hashlib
+import json
 import time
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Optional
 import uuid
 
 import redis
 
+# Ban data only ever stores user ids as keyed hashes. The key keeps the small
+# Telegram id space from being brute-forced back into ids; the LRU keeps
+# repeated lookups of the same (active) users off the hash entirely.
+
+USER_TOKEN_DIGEST_SIZE = 20
+LEGACY_USER_TOKEN_LENGTH = 64  # hex sha256, before tokens were keyed
+
+
+def _legacy_user_token(user_id: int) -> str:
+    return hashlib.sha256(str(user_id).encode()).hexdigest()
+
+
+def rehash_legacy_user_token(legacy_token: str, key: bytes) -> str:
+    # Legacy tokens can't be turned back into ids, so the current token is
+    # defined on top of them: keyed_hash(sha256(id))
+    return hashlib.blake2b(
+        legacy_token.encode(), key=key, digest_size=USER_TOKEN_DIGEST_SIZE
+    ).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def hash_user_id(user_id: int, key: bytes) -> str:
+    return rehash_legacy_user_token(_legacy_user_token(user_id), key)
+
 
 class BotState:
+    KEY_PATTERN = "bot:*"
+
     OUTBOX_KEY = "bot:outbox_chat_id"
     USER_TO_BAN_KEY = "bot:ban:user:{}"
     BAN_TO_USER_KEY = "bot:ban:token:{}"
@@ -15,18 +43,92 @@ class BotState:
     #   intention  : <text>
     #   admin_id   : <telegram user id>
     #   timestamp  : <unix timestamp>
+    PUBLISH_QUEUE_KEY = "bot:publish:queue"
+    PENDING_KEY = "bot:pending"
+    #   <outbox message id> scored by <submit unix timestamp>
+    PENDING_INTENTION_KEY = "bot:pending:intention:{}"
+    #   (one per pending outbox message id, deleted once it's decided)
+    #   user_id : <telegram user id>
+    #   locale  : <sender's locale>
+    #   text    : <intention as sent to the outbox>
+    #   media   : <JSON list of [kind, file_id]>, if it came with attachments
+    PENDING_INTENTION_TTL = 90 * 24 * 60 * 60
+    HANDLED_KEY = "bot:handled"
+    #   <outbox message id> scored by <when it was decided>, kept for as long
+    #   as pending intentions are, so stale buttons can be told apart
+    REMINDERS_KEY = "bot:reminders"
+    #   <outbox message id> scored by <when admins were last reminded of it,
+    #   or its submit time if never>
+    REMINDERS_LOCK_KEY = "bot:reminders:lock"
+    STATS_KEY = "bot:stats:{}"
+    #   (one per UTC day, YYYY-MM-DD)
+    #   submitted        : <count>
+    #   accepted         : <count>
+    #   rejected         : <count>
+    #   banned           : <count>
+    #   responses        : <count of the above three>
+    #   response_seconds : <sum of submit-to-decision times>
+    STATS_SUBMITTERS_KEY = "bot:stats:{}:submitters"
+    #   HyperLogLog of user tokens
+    STATS_TTL = 400 * 24 * 60 * 60
+    CHATS_KEY = "bot:chats"
+    #   set of private chat ids of everyone who sent an intention, for
+    #   broadcasts. Nothing links them to the ban keys.
+    BROADCAST_KEY = "bot:broadcast:current"
+    #   (only while a broadcast is running or interrupted)
+    #   text           : <message, HTML>
+    #   report_chat_id : <chat the final counts are sent to>
+    #   cursor         : <SSCAN cursor of the next batch of bot:chats>
+    #   delivered      : <count so far>
+    #   blocked        : <count so far>
+    #   failed         : <count so far>
+    USER_DATA_KEY = "bot:user_data"
+    #   <telegram user id> : <json>, see persistence.RedisPersistence
+
+    OUTCOME_ACCEPTED = "accepted"
+    OUTCOME_REJECTED = "rejected"
+    OUTCOME_BANNED = "banned"
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, user_hash_key: bytes):
         self._r = redis_client
+        self._user_hash_key = user_hash_key
+
+    def close(self) -> None:
+        self._r.close()
 
     # --- Helpers ---
 
     def _hash_user_id(self, user_id: int) -> str:
-        return hashlib.sha256(str(user_id).encode()).hexdigest()
+        return hash_user_id(user_id, self._user_hash_key)
 
     def _generate_ban_token(self) -> str:
         return uuid.uuid4().hex
 
+    def _stats_day(self, timestamp: float) -> str:
+        return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+    def _finalize_pending(
+        self,
+        pipe: redis.client.Pipeline,
+        message_id: int,
+        outcome: str,
+        submitted_at: float,
+    ) -> None:
+        now = time.time()
+        stats_key = self.STATS_KEY.format(self._stats_day(now))
+
+        pipe.zrem(self.PENDING_KEY, str(message_id))
+        pipe.zrem(self.REMINDERS_KEY, str(message_id))
+        pipe.delete(self.PENDING_INTENTION_KEY.format(message_id))
+        pipe.zadd(self.HANDLED_KEY, {str(message_id): now})
+        pipe.zremrangebyscore(
+            self.HANDLED_KEY, "-inf", now - self.PENDING_INTENTION_TTL
+        )
+        pipe.hincrby(stats_key, outcome, 1)
+        pipe.hincrby(stats_key, "responses", 1)
+        pipe.hincrbyfloat(stats_key, "response_seconds", max(0.0, now - submitted_at))
+        pipe.expire(stats_key, self.STATS_TTL)
+
     # --- Outbox chat ----
 
     def get_outbox_chat_id(self) -> Optional[int]:
@@ -36,10 +138,211 @@ class BotState:
         return int(value)
 
     def set_outbox_chat_id(self, chat_id: Optional[int]) -> None:
+        # Pending message ids only make sense inside the old outbox chat
+        pipe = self._r.pipeline()
         if chat_id is None:
-            self._r.delete(self.OUTBOX_KEY)
+            pipe.delete(self.OUTBOX_KEY)
         else:
-            self._r.set(self.OUTBOX_KEY, chat_id)
+            pipe.set(self.OUTBOX_KEY, chat_id)
+        pipe.delete(self.PENDING_KEY)
+        pipe.delete(self.REMINDERS_KEY)
+        pipe.delete(self.HANDLED_KEY)
+        pipe.execute()
+
+    # --- Pending intentions ---
+
+    def add_pending(
+        self,
+        message_id: int,
+        user_id: int,
+        text: str,
+        locale: str,
+        media: Optional[list] = None,
+    ) -> None:
+        now = time.time()
+        day = self._stats_day(now)
+        stats_key = self.STATS_KEY.format(day)
+        submitters_key = self.STATS_SUBMITTERS_KEY.format(day)
+
+        pipe = self._r.pipeline()
+        pipe.zadd(self.PENDING_KEY, {str(message_id): now})
+        pipe.zadd(self.REMINDERS_KEY, {str(message_id): now})
+        details = {"user_id": user_id, "locale": locale, "text": text}
+        if media:
+            details["media"] = json.dumps(media)
+        intention_key = self.PENDING_INTENTION_KEY.format(message_id)
+        pipe.hset(intention_key, mapping=details)
+        pipe.expire(intention_key, self.PENDING_INTENTION_TTL)
+        # Private chats have the same id as the user
+        pipe.sadd(self.CHATS_KEY, user_id)
+        pipe.hincrby(stats_key, "submitted", 1)
+        pipe.pfadd(submitters_key, self._hash_user_id(user_id))
+        pipe.expire(stats_key, self.STATS_TTL)
+        pipe.expire(submitters_key, self.STATS_TTL)
+        pipe.execute()
+
+    def _decode_pending_intention(self, raw: dict) -> Optional[dict]:
+        # Intentions sent before details were stored have none
+        if not raw:
+            return None
+        return {
+            "user_id": int(raw["user_id"]),
+            "locale": raw["locale"],
+            "text": raw["text"],
+            "media": json.loads(raw["media"]) if "media" in raw else None,
+        }
+
+    def get_pending_intention(self, message_id: int) -> Optional[dict]:
+        raw = self._r.hgetall(self.PENDING_INTENTION_KEY.format(message_id))
+        return self._decode_pending_intention(raw)
+
+    def get_pending_range(
+        self, start: int, stop: int
+    ) -> list[tuple[int, float, Optional[dict]]]:
+        # Pending intentions from position start to stop (inclusive, 0 is the
+        # oldest) with their details, in two round-trips
+        items = self._r.zrange(self.PENDING_KEY, start, stop, withscores=True)
+        return self._with_details(items)
+
+    def get_pending_by_ids(
+        self, message_ids: list[int], limit: int
+    ) -> list[tuple[int, float, Optional[dict]]]:
+        # Those of the given intentions that are still pending, oldest first
+        # and at most limit of them, with their details, in two round-trips
+        if not message_ids:
+            return []
+
+        scores = self._r.zmscore(self.PENDING_KEY, [str(m) for m in message_ids])
+        items = sorted(
+            (
+                (message_id, ts)
+                for message_id, ts in zip(message_ids, scores)
+                if ts is not None
+            ),
+            key=lambda item: item[1],
+        )
+        return self._with_details(items[:limit])
+
+    def _with_details(
+        self, items: list[tuple[Any, float]]
+    ) -> list[tuple[int, float, Optional[dict]]]:
+        if not items:
+            return []
+
+        pipe = self._r.pipeline(transaction=False)
+        for message_id, _ in items:
+            pipe.hgetall(self.PENDING_INTENTION_KEY.format(message_id))
+        details = pipe.execute()
+
+        return [
+            (int(message_id), ts, self._decode_pending_intention(raw))
+            for (message_id, ts), raw in zip(items, details)
+        ]
+
+    def is_handled(self, message_id: int) -> bool:
+        return self._r.zscore(self.HANDLED_KEY, str(message_id)) is not None
+
+    def get_intention_status(self, message_id: int) -> tuple[bool, Optional[dict]]:
+        # is_handled() and get_pending_intention() in one round-trip
+        pipe = self._r.pipeline(transaction=False)
+        pipe.zscore(self.HANDLED_KEY, str(message_id))
+        pipe.hgetall(self.PENDING_INTENTION_KEY.format(message_id))
+        handled_at, raw = pipe.execute()
+        return handled_at is not None, self._decode_pending_intention(raw)
+
+    def accept_pending(
+        self, message_id: int, intention: str, submitted_at: float
+    ) -> None:
+        self._accept_pending([(message_id, intention, submitted_at)])
+
+    def accept_pending_many(self, items: list[tuple[int, str, float]]) -> None:
+        # (message id, intention, submit time) for each, in one transaction
+        self._accept_pending(items)
+
+    def _accept_pending(self, items: list[tuple[int, str, float]]) -> None:
+        if not items:
+            return
+
+        pipe = self._r.pipeline()
+        pipe.rpush(self.PUBLISH_QUEUE_KEY, *(intention for _, intention, _ in items))
+        for message_id, _, submitted_at in items:
+            self._finalize_pending(
+                pipe, message_id, self.OUTCOME_ACCEPTED, submitted_at
+            )
+        pipe.execute()
+
+    def reject_pending(self, message_id: int, submitted_at: float) -> None:
+        self._reject_pending([(message_id, submitted_at)])
+
+    def reject_pending_many(self, items: list[tuple[int, float]]) -> None:
+        # (message id, submit time) for each, in one transaction
+        self._reject_pending(items)
+
+    def _reject_pending(self, items: list[tuple[int, float]]) -> None:
+        if not items:
+            return
+
+        pipe = self._r.pipeline()
+        for message_id, submitted_at in items:
+            self._finalize_pending(
+                pipe, message_id, self.OUTCOME_REJECTED, submitted_at
+            )
+        pipe.execute()
+
+    def get_pending_page(
+        self, page: int, page_size: int
+    ) -> tuple[int, Optional[float], list[tuple[int, float]]]:
+        # Count, oldest submit time and the requested page, oldest first,
+        # all in one round-trip
+        start = page * page_size
+
+        pipe = self._r.pipeline(transaction=False)
+        pipe.zcard(self.PENDING_KEY)
+        pipe.zrange(self.PENDING_KEY, 0, 0, withscores=True)
+        pipe.zrange(self.PENDING_KEY, start, start + page_size - 1, withscores=True)
+        count, oldest, items = pipe.execute()
+
+        oldest_timestamp = oldest[0][1] if oldest else None
+        return count, oldest_timestamp, [(int(m), ts) for m, ts in items]
+
+    def acquire_reminders_lock(self, ttl_seconds: float) -> bool:
+        # Only one replica sends each round of reminders
+        return bool(
+            self._r.set(
+                self.REMINDERS_LOCK_KEY, "1", nx=True, px=int(ttl_seconds * 1000)
+            )
+        )
+
+    def pop_due_reminders(self, older_than: float) -> list[tuple[int, float]]:
+        # Pending intentions nobody was reminded of since `older_than`, with
+        # their submit times, oldest first. They're marked as reminded now,
+        # so they come up again only after another full interval.
+        due = self._r.zrangebyscore(self.REMINDERS_KEY, "-inf", older_than)
+        if not due:
+            return []
+
+        now = time.time()
+        pipe = self._r.pipeline()
+        # XX: don't bring back intentions finalized in the meantime
+        pipe.zadd(self.REMINDERS_KEY, {m: now for m in due}, xx=True)
+        pipe.zmscore(self.PENDING_KEY, due)
+        _, submitted = pipe.execute()
+
+        return [(int(m), ts) for m, ts in zip(due, submitted) if ts is not None]
+
+    # --- Publishing queue ---
+
+    def pop_publications(self) -> list[str]:
+        pipe = self._r.pipeline()
+        pipe.lrange(self.PUBLISH_QUEUE_KEY, 0, -1)
+        pipe.delete(self.PUBLISH_QUEUE_KEY)
+        intentions, _ = pipe.execute()
+        return intentions
+
+    def requeue_publications(self, intentions: list[str]) -> None:
+        # Put them back at the front, keeping their original order
+        if intentions:
+            self._r.lpush(self.PUBLISH_QUEUE_KEY, *reversed(intentions))
 
     # --- Banned users ---
 
@@ -53,17 +356,47 @@ class BotState:
         key = self.USER_TO_BAN_KEY.format(user_token)
         return self._r.get(key)
 
+    def get_guard_info(
+        self, user_id: Optional[int]
+    ) -> tuple[Optional[int], Optional[str]]:
+        # The outbox chat id and, if user_id is given, that user's ban token,
+        # in one round-trip
+        pipe = self._r.pipeline(transaction=False)
+        pipe.get(self.OUTBOX_KEY)
+        if user_id is not None:
+            pipe.get(self.USER_TO_BAN_KEY.format(self._hash_user_id(user_id)))
+        outbox_chat_id, *ban_token = pipe.execute()
+
+        return (
+            int(outbox_chat_id) if outbox_chat_id is not None else None,
+            ban_token[0] if ban_token else None,
+        )
+
     def get_ban_info_by_ban_token(self, ban_token: str) -> Optional[dict]:
         ban_key = self.BAN_TO_USER_KEY.format(ban_token)
         return self._r.hgetall(ban_key)
 
     def ban_user(
-        self, user_id: int, reason: str, intention: str, admin_id: int
+        self,
+        user_id: int,
+        reason: str,
+        intention: str,
+        admin_id: int,
+        message_id: Optional[int] = None,
+        submitted_at: Optional[float] = None,
     ) -> tuple[str, str]:
+        # message_id/submitted_at: the pending intention that got the user
+        # banned, if any, finalized along with the ban
         user_token = self._hash_user_id(user_id)
 
         existing = self.get_ban_token_by_user(user_id)
         if existing:
+            if message_id is not None and submitted_at is not None:
+                pipe = self._r.pipeline()
+                self._finalize_pending(
+                    pipe, message_id, self.OUTCOME_BANNED, submitted_at
+                )
+                pipe.execute()
             return user_token, existing
 
         ban_token = self._generate_ban_token()
@@ -83,6 +416,8 @@ class BotState:
                 "timestamp": time.time(),
             },
         )
+        if message_id is not None and submitted_at is not None:
+            self._finalize_pending(pipe, message_id, self.OUTCOME_BANNED, submitted_at)
         pipe.execute()
 
         return user_token, ban_token
@@ -102,3 +437,169 @@ class BotState:
         pipe.execute()
 
         return True
+
+    # --- Broadcasts ---
+
+    def count_chats(self) -> int:
+        return self._r.scard(self.CHATS_KEY)
+
+    def scan_chats(self, cursor: int, count: int) -> tuple[int, list[int]]:
+        cursor, chat_ids = self._r.sscan(self.CHATS_KEY, cursor, count=count)
+        return cursor, [int(chat_id) for chat_id in chat_ids]
+
+    def start_broadcast(self, text: str, report_chat_id: int) -> bool:
+        # False if another one hasn't finished yet
+        with self._r.pipeline() as pipe:
+            try:
+                pipe.watch(self.BROADCAST_KEY)
+                if pipe.exists(self.BROADCAST_KEY):
+                    return False
+                pipe.multi()
+                pipe.hset(
+                    self.BROADCAST_KEY,
+                    mapping={
+                        "text": text,
+                        "report_chat_id": report_chat_id,
+                        "cursor": 0,
+                        "delivered": 0,
+                        "blocked": 0,
+                        "failed": 0,
+                    },
+                )
+                pipe.execute()
+            except redis.WatchError:
+                return False
+
+        return True
+
+    def get_broadcast(self) -> Optional[dict]:
+        raw = self._r.hgetall(self.BROADCAST_KEY)
+        if not raw:
+            return None
+        return {
+            "text": raw["text"],
+            "report_chat_id": int(raw["report_chat_id"]),
+            "cursor": int(raw["cursor"]),
+            "delivered": int(raw["delivered"]),
+            "blocked": int(raw["blocked"]),
+            "failed": int(raw["failed"]),
+        }
+
+    def save_broadcast_progress(
+        self,
+        cursor: int,
+        delivered: int,
+        blocked: int,
+        failed: int,
+        blocked_chat_ids: list[int],
+    ) -> None:
+        # Chats that blocked the bot are dropped along with the checkpoint
+        pipe = self._r.pipeline()
+        if blocked_chat_ids:
+            pipe.srem(self.CHATS_KEY, *blocked_chat_ids)
+        pipe.hset(
+            self.BROADCAST_KEY,
+            mapping={
+                "cursor": cursor,
+                "delivered": delivered,
+                "blocked": blocked,
+                "failed": failed,
+            },
+        )
+        pipe.execute()
+
+    def finish_broadcast(self) -> None:
+        self._r.delete(self.BROADCAST_KEY)
+
+    # --- User data ---
+
+    def get_all_user_data(self) -> dict[int, dict]:
+        raw = self._r.hgetall(self.USER_DATA_KEY)
+        return {int(user_id): json.loads(data) for user_id, data in raw.items()}
+
+    def save_user_data(self, user_id: int, data: dict) -> None:
+        if data:
+            self._r.hset(self.USER_DATA_KEY, str(user_id), json.dumps(data))
+        else:
+            self._r.hdel(self.USER_DATA_KEY, str(user_id))
+
+    def drop_user_data(self, user_id: int) -> None:
+        self._r.hdel(self.USER_DATA_KEY, str(user_id))
+
+    # --- Statistics ---
+
+    def get_stats(self, days: int) -> tuple[list[tuple[str, dict]], int]:
+        # Per-day counters for the last `days` UTC days (oldest first) and
+        # the approximate number of distinct submitters over all of them
+        now = time.time()
+        day_names = [
+            self._stats_day(now - i * 24 * 60 * 60) for i in reversed(range(days))
+        ]
+
+        pipe = self._r.pipeline(transaction=False)
+        for day in day_names:
+            pipe.hgetall(self.STATS_KEY.format(day))
+        pipe.pfcount(*[self.STATS_SUBMITTERS_KEY.format(day) for day in day_names])
+        *buckets, unique_submitters = pipe.execute()
+
+        return list(zip(day_names, buckets)), unique_submitters
+
+    def migrate_legacy_user_tokens(self, batch_size: int = 500) -> int:
+        # Rewrites unkeyed sha256 user tokens to keyed ones. Already migrated
+        # keys are skipped by their length, so it's safe to run again or to
+        # resume after being interrupted.
+        migrated = 0
+
+        for keys in self._scan_batches(self.USER_TO_BAN_KEY.format("*"), batch_size):
+            legacy_keys = [
+                k for k in keys if len(k.rsplit(":", 1)[1]) == LEGACY_USER_TOKEN_LENGTH
+            ]
+            if not legacy_keys:
+                continue
+
+            pipe = self._r.pipeline(transaction=False)
+            for key in legacy_keys:
+                pipe.get(key)
+            ban_tokens = pipe.execute()
+
+            pipe = self._r.pipeline()
+            for key, ban_token in zip(legacy_keys, ban_tokens):
+                if ban_token is None:
+                    continue
+
+                legacy_token = key.rsplit(":", 1)[1]
+                user_token = rehash_legacy_user_token(legacy_token, self._user_hash_key)
+
+                pipe.set(self.USER_TO_BAN_KEY.format(user_token), ban_token)
+                pipe.delete(key)
+                pipe.hset(
+                    self.BAN_TO_USER_KEY.format(ban_token), "user_token", user_token
+                )
+                migrated += 1
+            pipe.execute()
+
+        return migrated
+
+    def _scan_batches(self, pattern: str, batch_size: int):
+        cursor = 0
+        while True:
+            cursor, keys = self._r.scan(cursor, match=pattern, count=batch_size)
+            if keys:
+                yield keys
+            if cursor == 0:
+                return
+
+
+_state: Optional[BotState] = None
+
+
+def init_state(state: BotState) -> BotState:
+    global _state
+    _state = state
+    return _state
+
+
+def get_state() -> BotState:
+    if _state is None:
+        raise RuntimeError("Bot state was not initialized")
+    return _state
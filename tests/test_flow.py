@@ -0,0 +1,18 @@
+import os
+import sys
+
+from hypothesis.stateful import run_state_machine_as_test
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts"))
+
+import replay  # noqa: E402
+
+# A few sequences of the state machine scripts/replay.py --fuzz runs, so its
+# invariants (one outbox message per confirmed intention, decided at most
+# once, published once) are checked on every test run. --fuzz runs more.
+
+
+def test_intention_flow():
+    run_state_machine_as_test(
+        replay.intention_flow(), settings=replay.fuzz_settings(examples=10, steps=20)
+    )
@@ -0,0 +1,29 @@
+import string
+
+import pytest
+
+from i18n import AVAILABLE_LOCALES, init_i18n, load_catalog, t, template
+
+
+@pytest.fixture(scope="module", autouse=True)
+def catalogs():
+    init_i18n("pt", "pt")
+
+
+def sample_fields(text: str) -> dict:
+    # Numbers where there's a format spec, otherwise text with the characters
+    # the compiled f-strings could trip on
+    return {
+        name: 1.5 if spec else f"{{{name}}} '\" \\"
+        for _, name, spec, _ in string.Formatter().parse(text)
+        if name is not None
+    }
+
+
+@pytest.mark.parametrize("locale", AVAILABLE_LOCALES)
+def test_compiled_templates_match_format(locale):
+    for key, text in load_catalog(locale).items():
+        fields = sample_fields(text)
+        expected = text.format(**fields)
+        assert t(locale, key, **fields) == expected, key
+        assert template(locale, key)(**fields) == expected, key
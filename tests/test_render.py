@@ -0,0 +1,140 @@
+import html as _html
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from i18n import init_i18n, t
+from render import Html, escape, html, split_html
+
+TAG = re.compile(r"<(/?)([a-zA-Z]+)[^>]*>")
+ENTITY = re.compile(r"&(#\d+|#x[0-9a-fA-F]+|\w+);")
+
+# Text as users write it, weighted towards what needs escaping and towards
+# the characters split_html() prefers to break at
+user_text = st.text(
+    alphabet=st.one_of(
+        st.sampled_from("<>&;#\"' \n"),
+        st.characters(codec="utf-8", exclude_categories=("Cs",)),
+    )
+)
+
+
+@st.composite
+def markup(draw, depth: int = 0) -> str:
+    # What the bot sends: escaped user text inside the tags Telegram supports
+    parts = []
+    for _ in range(draw(st.integers(0, 4))):
+        if depth < 3 and draw(st.booleans()):
+            name = draw(st.sampled_from(["b", "i", "u", "s", "code", "pre", "a"]))
+            attributes = ' href="https://t.me/c/1/2"' if name == "a" else ""
+            inner = draw(markup(depth + 1))
+            parts.append(f"<{name}{attributes}>{inner}</{name}>")
+        else:
+            parts.append(escape(draw(user_text)))
+    return "".join(parts)
+
+
+def visible(text: str) -> str:
+    return _html.unescape(TAG.sub("", text))
+
+
+def assert_balanced(chunk: str) -> None:
+    open_tags = []
+    for m in TAG.finditer(chunk):
+        closing, name = m.group(1), m.group(2).lower()
+        if closing:
+            assert open_tags and open_tags[-1] == name, chunk
+            open_tags.pop()
+        else:
+            open_tags.append(name)
+    assert not open_tags, chunk
+
+
+@pytest.fixture(scope="module", autouse=True)
+def catalogs():
+    init_i18n("pt", "pt")
+
+
+# --- escape ---
+
+
+@given(user_text)
+def test_escape_round_trips(text):
+    assert _html.unescape(escape(text)) == text
+
+
+@given(user_text)
+def test_escape_leaves_no_markup(text):
+    escaped = escape(text)
+    assert "<" not in escaped
+    assert ">" not in escaped
+    # Every & left starts one of the entities escape() writes
+    assert ENTITY.sub("", escaped).count("&") == 0
+    assert set(ENTITY.findall(escaped)) <= {"amp", "lt", "gt"}
+
+
+# --- split_html ---
+
+
+@given(markup(), st.integers(1, 80))
+def test_split_chunks_fit_the_limit(text, limit):
+    for chunk in split_html(text, limit):
+        assert len(visible(chunk)) <= limit
+
+
+@given(markup(), st.integers(1, 80))
+def test_split_chunks_are_balanced(text, limit):
+    for chunk in split_html(text, limit):
+        assert_balanced(chunk)
+
+
+@given(markup(), st.integers(1, 80))
+def test_split_keeps_the_text(text, limit):
+    # Only whitespace where a chunk was cut may be dropped
+    joined = "".join(visible(chunk) for chunk in split_html(text, limit))
+    assert re.sub(r"\s", "", joined) == re.sub(r"\s", "", visible(text))
+
+
+@given(markup(), st.integers(1, 80))
+def test_split_keeps_entities_whole(text, limit):
+    for chunk in split_html(text, limit):
+        assert ENTITY.sub("", TAG.sub("", chunk)).count("&") == 0
+
+
+@given(markup())
+def test_split_leaves_short_text_alone(text):
+    assert split_html(text, len(visible(text)) + len(text)) == [text]
+
+
+# --- html() ---
+
+
+@given(user_text, user_text)
+def test_html_escapes_fields(intention, reason):
+    rendered = html("pt", "outcome.rejected", intention=intention, reason=reason)
+
+    assert rendered == t(
+        "pt", "outcome.rejected", intention=escape(intention), reason=escape(reason)
+    )
+    # Only the template's own tags
+    assert TAG.findall(rendered) == TAG.findall(
+        t("pt", "outcome.rejected", intention="", reason="")
+    )
+
+
+@given(st.integers(), st.integers(0, 10**6))
+def test_html_keeps_numbers(count, days):
+    assert html("pt", "stats.header", days=days) == t("pt", "stats.header", days=days)
+    assert html("pt", "queue.header", count=count) == t(
+        "pt", "queue.header", count=count
+    )
+
+
+@given(user_text)
+def test_html_keeps_bot_markup(text):
+    label = Html(f"<b>{escape(text)}</b>")
+    assert html("pt", "reminder.item", label=label, age="1h") == t(
+        "pt", "reminder.item", label=label, age="1h"
+    )